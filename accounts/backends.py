@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the session user, with their seller profile (or
+    its absence) already loaded, in the cache. AuthenticationMiddleware then
+    needs no user query; the entry is dropped when the user or profile is saved.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = (
+                User._default_manager.select_related("seller_profile")
+                .filter(pk=user_id)
+                .first()
+            )
+            if user is None:
+                return None
+            cache.set(key, user, getattr(settings, "USER_CACHE_TIMEOUT", 300))
+        return user if self.user_can_authenticate(user) else None
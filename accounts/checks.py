@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+CACHED_SESSION_ENGINES = [
+    "django.contrib.sessions.backends.cache",
+    "django.contrib.sessions.backends.cached_db",
+]
+CACHED_AUTH_BACKEND = "accounts.backends.CachedModelBackend"
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cached sessions and users need a cache all workers share: with a
+    per-process cache a logout or profile change only reaches one worker.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in getattr(settings, "SHARED_CACHE_BACKENDS", []):
+        return []
+
+    errors = []
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        errors.append(
+            Error(
+                f"SESSION_ENGINE {settings.SESSION_ENGINE} needs a shared cache, "
+                f"but the default cache is {backend}.",
+                hint="Set CACHE_BACKEND to Redis or Memcached, or use the db "
+                "session engine.",
+                id="accounts.E001",
+            )
+        )
+    if CACHED_AUTH_BACKEND in settings.AUTHENTICATION_BACKENDS:
+        errors.append(
+            Error(
+                f"{CACHED_AUTH_BACKEND} needs a shared cache, but the default "
+                f"cache is {backend}.",
+                hint="Set CACHE_BACKEND to Redis or Memcached, or remove the "
+                "backend from AUTHENTICATION_BACKENDS.",
+                id="accounts.E002",
+            )
+        )
+    return errors
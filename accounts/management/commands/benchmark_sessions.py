@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+User = get_user_model()
+
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+AUTH_BACKENDS = {
+    "model": ["django.contrib.auth.backends.ModelBackend"],
+    "cached": ["accounts.backends.CachedModelBackend"],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries and latency per request for session engines and auth backends"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="Number of timed requests per configuration",
+        )
+        parser.add_argument(
+            "--url",
+            help="Path to request as a logged-in buyer (default: the cart page)",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        user = User.objects.filter(is_seller=False, is_active=True).first()
+        if user is None:
+            raise CommandError("Create at least one active buyer account first")
+        url = options["url"] or reverse("orders:cart")
+
+        self.stdout.write(
+            f"{'session':<16}{'auth':<8}{'status':>8}{'queries':>9}{'mean ms':>10}{'p95 ms':>10}"
+        )
+        for session_name, engine in SESSION_ENGINES.items():
+            for auth_name, backends in AUTH_BACKENDS.items():
+                with override_settings(
+                    SESSION_ENGINE=engine,
+                    AUTHENTICATION_BACKENDS=backends,
+                    ALLOWED_HOSTS=["testserver"],
+                ):
+                    cache.clear()
+                    client = Client()
+                    client.force_login(user, backend=backends[0])
+                    client.get(url)
+
+                    queries = []
+                    with connection.execute_wrapper(
+                        lambda execute, sql, *args: queries.append(sql)
+                        or execute(sql, *args)
+                    ):
+                        response = client.get(url)
+
+                    timings = []
+                    for _ in range(iterations):
+                        start = time.perf_counter()
+                        client.get(url)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    timings.sort()
+                    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                    self.stdout.write(
+                        f"{session_name:<16}{auth_name:<8}{response.status_code:>8}"
+                        f"{len(queries):>9}{statistics.mean(timings):>10.2f}{p95:>10.2f}"
+                    )
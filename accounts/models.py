@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils.text import slugify
+
+from marketplace.slugs import slugify
 
 
 class User(AbstractUser):
@@ -14,6 +15,14 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def store(self):
+        """Seller profile or None; a missing profile is remembered like a found one"""
+        try:
+            return self.seller_profile
+        except SellerProfile.DoesNotExist:
+            return None
+
 
 class SellerProfile(models.Model):
     user = models.OneToOneField(
@@ -74,10 +83,10 @@ class SellerProfile(models.Model):
         """Calculate average rating for the seller based on product reviews"""
         from products.models import Review
 
-        reviews = Review.objects.filter(product__seller=self.user)
-        if not reviews:
-            return 0
-        return sum(review.rating for review in reviews) / len(reviews)
+        average = Review.objects.filter(product__seller=self.user).aggregate(
+            average=models.Avg("rating")
+        )["average"]
+        return average or 0
 
     @property
     def total_reviews(self):
@@ -93,11 +102,9 @@ class SellerProfile(models.Model):
 
     @property
     def total_sales(self):
-        """Get total number of completed orders"""
-        from orders.models import Order
-
-        return (
-            Order.objects.filter(items__product__seller=self.user, status="paid")
-            .distinct()
-            .count()
-        )
+        """Get total number of completed orders from the seller's sub-orders"""
+        from orders.models import SellerOrder
+
+        return SellerOrder.objects.filter(
+            seller=self.user, status__in=["paid", "shipped"]
+        ).count()
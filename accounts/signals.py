@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from marketplace.page_cache import invalidate_tags, seller_tag
+from products.autocomplete import invalidate_index
+
+from .backends import invalidate_cached_user
+from .models import SellerProfile, User
+
+
+@receiver([post_save, post_delete], sender=SellerProfile)
+def invalidate_store_pages(sender, instance, **kwargs):
+    invalidate_tags(seller_tag(instance.user_id))
+    invalidate_index()
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
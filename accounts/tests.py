@@ -1 +1,122 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.checks import check_shared_cache
+from accounts.models import SellerProfile, User
+from marketplace.testing import (
+    QueryBudgetMixin,
+    create_seller,
+    seed_customers,
+    seed_products,
+)
+from products.models import Product, Review
+
+
+class SellerQueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "accounts:seller_store_view": 5,
+        "accounts:seller_profile_view": 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.profile = SellerProfile.objects.create(
+            user=cls.seller, store_name="Крамниця"
+        )
+
+    def seed(self, count):
+        """Bring the seller's products, each with one review, to count"""
+        products = seed_products(self.seller, count)
+        customers = seed_customers(products)
+        Review.objects.bulk_create(
+            Review(product=product, user=customer, rating=5, comment="Чудово")
+            for product, customer in zip(products, customers)
+        )
+
+    def test_seller_store_view(self):
+        self.assertQueriesFlat("accounts:seller_store_view", self.profile.store_slug)
+
+    def test_seller_profile_view(self):
+        self.client.force_login(self.seller)
+        self.assertQueriesFlat("accounts:seller_profile_view")
+
+
+class UserStoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.buyer = User.objects.create_user("buyer", password="pass")
+        cls.profile = SellerProfile.objects.create(
+            user=cls.seller, store_name="Крамниця"
+        )
+        cls.product = Product.objects.create(
+            name="Товар", slug="tovar", seller=cls.seller, price=10, stock=1
+        )
+
+    def test_missing_store_is_looked_up_once(self):
+        buyer = User.objects.get(pk=self.buyer.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNone(buyer.store)
+            self.assertIsNone(buyer.store)
+
+    def test_product_detail_store_link_needs_no_profile_query(self):
+        url = reverse("products:detail", args=[self.product.slug])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(
+            response,
+            reverse("accounts:seller_store_view", args=[self.profile.store_slug]),
+        )
+        profile_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if 'FROM "accounts_sellerprofile"' in query["sql"]
+        ]
+        self.assertEqual(profile_queries, [])
+
+
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=["accounts.backends.CachedModelBackend"],
+)
+class CachedSessionTests(TestCase):
+    def test_cached_user_needs_no_session_or_user_query(self):
+        buyer = User.objects.create_user("buyer", password="pass")
+        self.client.force_login(buyer, backend="accounts.backends.CachedModelBackend")
+        url = reverse("orders:cart")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        tables = " ".join(query["sql"] for query in context.captured_queries)
+        self.assertNotIn('"django_session"', tables)
+        self.assertNotIn('FROM "accounts_user"', tables)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    cached = {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "AUTHENTICATION_BACKENDS": ["accounts.backends.CachedModelBackend"],
+    }
+
+    def test_defaults_pass(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    def test_cached_settings_need_a_shared_cache(self):
+        with self.settings(**self.cached):
+            errors = check_shared_cache(None)
+        self.assertEqual(
+            [error.id for error in errors], ["accounts.E001", "accounts.E002"]
+        )
+
+    def test_shared_cache_allows_cached_settings(self):
+        caches = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379",
+            }
+        }
+        with self.settings(CACHES=caches, **self.cached):
+            self.assertEqual(check_shared_cache(None), [])
@@ -15,5 +15,7 @@ urlpatterns = [
     ),
     path("seller/profile/edit/", views.seller_profile_edit, name="seller_profile_edit"),
     path("seller/profile/", views.seller_profile_view, name="seller_profile_view"),
-    path("store/<slug:store_slug>/", views.seller_store_view, name="seller_store_view"),
+    path(
+        "store/<uslug:store_slug>/", views.seller_store_view, name="seller_store_view"
+    ),
 ]
@@ -1,8 +1,16 @@
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
+from django.db.models import Avg, Q
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, redirect, render
 
+from marketplace.page_cache import (
+    add_page_cache_tags,
+    cache_anonymous_page,
+    seller_tag,
+)
+
 from .forms import SellerProfileForm, SellerRegisterForm, UserRegisterForm
 from .models import SellerProfile, User
 
@@ -61,12 +69,9 @@ def seller_profile_setup(request):
         messages.error(request, "Ця сторінка доступна тільки для продавців")
         return redirect("products:list")
 
-    try:
-        profile = request.user.seller_profile
+    if request.user.store:
         messages.info(request, "Профіль магазину вже налаштований")
         return redirect("accounts:seller_profile_edit")
-    except SellerProfile.DoesNotExist:
-        pass
 
     if request.method == "POST":
         form = SellerProfileForm(request.POST, request.FILES)
@@ -93,9 +98,8 @@ def seller_profile_edit(request):
         messages.error(request, "Ця сторінка доступна тільки для продавців")
         return redirect("products:list")
 
-    try:
-        profile = request.user.seller_profile
-    except SellerProfile.DoesNotExist:
+    profile = request.user.store
+    if profile is None:
         messages.error(
             request, "Профіль магазину не знайдено. Будь ласка, створіть його."
         )
@@ -125,9 +129,8 @@ def seller_profile_view(request):
         messages.error(request, "Ця сторінка доступна тільки для продавців")
         return redirect("products:list")
 
-    try:
-        profile = request.user.seller_profile
-    except SellerProfile.DoesNotExist:
+    profile = request.user.store
+    if profile is None:
         messages.error(
             request, "Профіль магазину не знайдено. Будь ласка, створіть його."
         )
@@ -148,13 +151,24 @@ def seller_profile_view(request):
     return render(request, "accounts/seller_profile_view.html", context)
 
 
+@cache_anonymous_page()
 def seller_store_view(request, store_slug):
     """Public view of a seller's store"""
     profile = get_object_or_404(SellerProfile, store_slug=store_slug, is_active=True)
+    add_page_cache_tags(request, seller_tag(profile.user_id))
+
+    products = list(
+        profile.user.products.filter(is_active=True)
+        .annotate(
+            rating=Coalesce(
+                Avg("reviews__rating", filter=Q(reviews__user__isnull=False)),
+                0.0,
+            )
+        )
+        .order_by("-created_at")
+    )
 
-    products = profile.user.products.filter(is_active=True).order_by("-created_at")
-
-    total_products = products.count()
+    total_products = len(products)
     total_reviews = profile.total_reviews
     avg_rating = profile.average_rating
 
@@ -0,0 +1,95 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads of the apps listed in
+``DATABASE_REPLICA_APPS`` go to one of ``DATABASE_REPLICAS`` unless the
+current request is pinned to the primary: unsafe requests, requests that
+already wrote, open transactions and clients that wrote within the last
+``DATABASE_PIN_SECONDS`` (tracked with a cookie) all read from ``default``.
+
+A write pins the rest of the current ``routing_scope()`` to the primary. The
+middleware opens one per request; outside of one (management commands) a
+write pins the whole run, so long-lived workers should open one per job.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "pin_primary"
+
+_pinned = ContextVar("db_pinned_to_primary", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Route reads afresh inside the block, forgetting writes made in it"""
+    pinned_token = _pinned.set(pinned)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+
+def _replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = _replicas()
+        if (
+            not replicas
+            or _pinned.get()
+            or _wrote.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or model._meta.app_label
+            not in getattr(settings, "DATABASE_REPLICA_APPS", [])
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *_replicas()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinningMiddleware:
+    """Pin reads to the primary for unsafe requests and shortly after writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            or PIN_COOKIE in request.COOKIES
+        )
+        with routing_scope(pinned):
+            response = self.get_response(request)
+            if _wrote.get():
+                response.set_cookie(
+                    PIN_COOKIE,
+                    "1",
+                    max_age=getattr(settings, "DATABASE_PIN_SECONDS", 5),
+                    httponly=True,
+                    samesite="Lax",
+                )
+        return response
@@ -0,0 +1,90 @@
+"""
+Gunicorn configuration: ``gunicorn -c python:marketplace.gunicorn_conf``.
+
+Settings come from the environment: ``WEB_CONCURRENCY`` (workers, defaults to
+2 * CPUs + 1), ``WORKER_CLASS`` (sync, gthread or uvicorn), ``THREADS`` and
+``BIND``/``PORT``.
+"""
+
+import multiprocessing
+import os
+import time
+
+# Module-level names are read as gunicorn settings, so ``config`` must not be
+# imported directly (gunicorn has a setting of that name).
+import decouple
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+worker_type = decouple.config("WORKER_CLASS", default="sync")
+if worker_type not in WORKER_CLASSES:
+    raise ValueError(
+        f"WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, got {worker_type!r}"
+    )
+
+wsgi_app = (
+    "marketplace.asgi:application"
+    if worker_type == "uvicorn"
+    else "marketplace.wsgi:application"
+)
+bind = decouple.config(
+    "BIND", default=f"0.0.0.0:{decouple.config('PORT', default='8000')}"
+)
+workers = decouple.config(
+    "WEB_CONCURRENCY", default=multiprocessing.cpu_count() * 2 + 1, cast=int
+)
+worker_class = WORKER_CLASSES[worker_type]
+threads = decouple.config(
+    "THREADS", default=4 if worker_type == "gthread" else 1, cast=int
+)
+preload_app = True
+timeout = decouple.config("WORKER_TIMEOUT", default=30, cast=int)
+keepalive = 5
+max_requests = decouple.config("MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+_started = time.perf_counter()
+
+
+def _memory_mb():
+    """Resident and private (not shared with the master) memory in MB"""
+    rss = private = 0
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                name, value = line.split(":", 1)[0], line.split()[1:2]
+                if name == "Rss":
+                    rss = int(value[0])
+                elif name in ("Private_Clean", "Private_Dirty"):
+                    private += int(value[0])
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        rss = private = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024, private / 1024
+
+
+def when_ready(server):
+    from marketplace.warmup import warm_up
+
+    warm_up()
+    server.log.info(
+        "Master %s ready in %.2fs, RSS %.1f MB, spawning %s %s worker(s)",
+        os.getpid(),
+        time.perf_counter() - _started,
+        _memory_mb()[0],
+        workers,
+        worker_type,
+    )
+
+
+def post_worker_init(worker):
+    rss, private = _memory_mb()
+    worker.log.info(
+        "Worker %s booted, RSS %.1f MB, private %.1f MB", worker.pid, rss, private
+    )
@@ -0,0 +1,223 @@
+"""
+Opt-in full-page cache for anonymous catalog pages.
+
+Entries are keyed by language, path, sorted query params and the HX-Request
+header. Each entry remembers the versions of the tags it was rendered with;
+bumping a tag (see ``invalidate_tags``) makes every entry carrying it stale.
+Only one worker regenerates a stale or missing entry at a time, the others
+serve the stale copy or briefly wait for the fresh one. Hits repeat the
+stored ``STORED_HEADERS`` and get the requesting client's CSRF token.
+"""
+
+import hashlib
+import re
+import time
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+
+KEY_PREFIX = "pagecache"
+# Changes on every invalidation, so a render can tell whether any tag moved
+EPOCH_KEY = f"{KEY_PREFIX}:epoch"
+# Response headers views may set that a cached hit has to repeat
+STORED_HEADERS = ["Content-Language", "Content-Disposition", "Link", "Vary"]
+CSRF_PLACEHOLDER = "__PAGE_CACHE_CSRF_TOKEN__"
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _cache():
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def _enabled():
+    return getattr(settings, "PAGE_CACHE_ENABLED", False)
+
+
+def product_tag(product_id):
+    return f"product:{product_id}"
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def seller_tag(user_id):
+    return f"seller:{user_id}"
+
+
+CATALOG_TAG = "catalog"
+
+
+def _tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def _tag_versions(tags):
+    """Return the current version of every tag, initialising missing ones."""
+    if not tags:
+        return {}
+    cache = _cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Mark every cached page rendered with any of ``tags`` as stale."""
+    tags = [tag for tag in tags if tag]
+    if tags:
+        versions = {_tag_key(tag): uuid.uuid4().hex for tag in tags}
+        _cache().set_many({**versions, EPOCH_KEY: uuid.uuid4().hex}, None)
+
+
+def add_page_cache_tags(request, *tags):
+    """Attach invalidation tags to the page being rendered for ``request``."""
+    request._page_cache_tags = getattr(request, "_page_cache_tags", set()) | {
+        tag for tag in tags if tag
+    }
+
+
+def page_cache_key(request):
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        for value in values
+        if value != ""
+    )
+    raw = "|".join(
+        [
+            translation.get_language() or "",
+            request.path,
+            urlencode(params),
+            "hx" if request.headers.get("HX-Request") else "",
+        ]
+    )
+    return f"{KEY_PREFIX}:page:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def _is_fresh(entry):
+    return _tag_versions(entry["tags"].keys()) == entry["tags"]
+
+
+def _build_response(request, entry):
+    content = entry["content"]
+    if CSRF_PLACEHOLDER.encode() in content:
+        content = content.replace(
+            CSRF_PLACEHOLDER.encode(), get_token(request).encode()
+        )
+    response = HttpResponse(content, content_type=entry["content_type"])
+    for header, value in entry.get("headers", {}).items():
+        response[header] = value
+    response["X-Page-Cache"] = "hit"
+    return response
+
+
+def _store(request, key, response, tags_before, epoch_before):
+    if (
+        response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or response.has_header("Cache-Control")
+    ):
+        return
+    tags = getattr(request, "_page_cache_tags", set())
+    versions = _tag_versions(tags)
+    # A tag bumped while we were rendering means our content may already be old.
+    if any(tags_before.get(tag, versions[tag]) != versions[tag] for tag in tags):
+        return
+    # Tags the view added have no version from before it read its data, so any
+    # invalidation during the render could have been one of theirs.
+    if tags - tags_before.keys() and _cache().get(EPOCH_KEY) != epoch_before:
+        return
+    content = CSRF_INPUT_RE.sub(
+        rf"\g<1>{CSRF_PLACEHOLDER}\g<2>", response.content.decode(response.charset)
+    ).encode(response.charset)
+    entry = {
+        "content": content,
+        "content_type": response["Content-Type"],
+        "headers": {
+            header: response[header]
+            for header in STORED_HEADERS
+            if response.has_header(header)
+        },
+        "tags": versions,
+    }
+    # Stale entries are kept around past their TTL so they can be served
+    # while a single worker regenerates them.
+    timeout = getattr(settings, "PAGE_CACHE_TIMEOUT", 300)
+    _cache().set(key, entry, timeout * 2)
+    _cache().set(f"{key}:expires", time.time() + timeout, timeout * 2)
+
+
+def cache_anonymous_page(tags=None):
+    """
+    Cache anonymous GET responses of the decorated view.
+
+    ``tags`` is an optional callable ``(request, *args, **kwargs)`` returning
+    the invalidation tags known before rendering; views can add more with
+    ``add_page_cache_tags``.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not _enabled()
+                or request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+            ):
+                return view_func(request, *args, **kwargs)
+
+            cache = _cache()
+            key = page_cache_key(request)
+            entry = cache.get(key)
+            expires = cache.get(f"{key}:expires", 0)
+            if entry is not None and expires > time.time() and _is_fresh(entry):
+                return _build_response(request, entry)
+
+            lock_key = f"{key}:lock"
+            lock_timeout = getattr(settings, "PAGE_CACHE_LOCK_TIMEOUT", 10)
+            if not cache.add(lock_key, 1, lock_timeout):
+                if entry is not None:
+                    return _build_response(request, entry)
+                deadline = time.monotonic() + getattr(
+                    settings, "PAGE_CACHE_LOCK_WAIT", 2
+                )
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    entry = cache.get(key)
+                    if entry is not None:
+                        return _build_response(request, entry)
+                return view_func(request, *args, **kwargs)
+
+            try:
+                if tags is not None:
+                    add_page_cache_tags(request, *tags(request, *args, **kwargs))
+                tags_before = _tag_versions(getattr(request, "_page_cache_tags", ()))
+                epoch_before = cache.get(EPOCH_KEY)
+                response = view_func(request, *args, **kwargs)
+                if hasattr(response, "render") and callable(response.render):
+                    response = response.render()
+                _store(request, key, response, tags_before, epoch_before)
+            finally:
+                cache.delete(lock_key)
+            response["X-Page-Cache"] = "miss"
+            return response
+
+        return wrapper
+
+    return decorator
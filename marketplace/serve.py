@@ -0,0 +1,16 @@
+"""Production entry point: ``poetry run start`` or ``python -m marketplace.serve``."""
+
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "marketplace.settings")
+    from gunicorn.app.wsgiapp import run
+
+    sys.argv = ["gunicorn", "-c", "python:marketplace.gunicorn_conf", *sys.argv[1:]]
+    run()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,19 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
 SECRET_KEY = config("SECRET_KEY", default="django-insecure-change-me-in-production")
 
-DEBUG = True
+DEBUG = config("DEBUG", default=True, cast=bool)
 
-ALLOWED_HOSTS = ["localhost", "127.0.0.1", "testserver"]
+ALLOWED_HOSTS = config(
+    "ALLOWED_HOSTS", default="localhost,127.0.0.1,testserver", cast=Csv()
+)
+CSRF_TRUSTED_ORIGINS = config("CSRF_TRUSTED_ORIGINS", default="", cast=Csv())
 
 
 INSTALLED_APPS = [
@@ -41,7 +44,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "marketplace.db_router.PrimaryPinningMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -56,8 +61,7 @@ ROOT_URLCONF = "marketplace.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
-        "APP_DIRS": True,
+        "DIRS": [BASE_DIR / "templates"],
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
@@ -65,22 +69,131 @@ TEMPLATES = [
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.csrf",
             ],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
         },
     },
 ]
+if DEBUG:
+    # Plain loaders pick up template edits without relying on the autoreloader.
+    TEMPLATES[0]["OPTIONS"]["loaders"] = TEMPLATES[0]["OPTIONS"]["loaders"][0][1]
 
 WSGI_APPLICATION = "marketplace.wsgi.application"
-TEMPLATES[0]["DIRS"] = [BASE_DIR / "templates"]
 
 
-DATABASES = {
+DB_ENGINE = config("DB_ENGINE", default="sqlite")
+
+if DB_ENGINE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": config("DB_NAME", default="marketplace"),
+            "USER": config("DB_USER", default="marketplace"),
+            "PASSWORD": config("DB_PASSWORD", default=""),
+            "HOST": config("DB_HOST", default="localhost"),
+            "PORT": config("DB_PORT", default="5432"),
+            "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / config("DB_NAME", default="db.sqlite3"),
+            "OPTIONS": {
+                "timeout": 20,
+                "transaction_mode": "IMMEDIATE",
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=134217728, cast=int)};"
+                    "PRAGMA temp_store=MEMORY;"
+                ),
+            },
+        }
+    }
+
+# Read replicas: a comma-separated list of SQLite files (or hosts for server
+# databases), each a mirror of "default". Tests mirror them onto "default".
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config("DB_REPLICAS", default="", cast=Csv()), 1):
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "TEST": {"MIRROR": "default"},
+    }
+    if DATABASES[alias]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[alias]["NAME"] = BASE_DIR / replica
+    else:
+        DATABASES[alias]["HOST"] = replica
+    DATABASE_REPLICAS.append(alias)
+
+# One more mirror of "default" that nothing routes to unless it is listed in
+# DATABASE_REPLICAS, so routing tests have a second connection to check
+# against under any test runner. SQLite test databases share one in-memory
+# cache, where the mirror has to read uncommitted rows to avoid lock errors
+# while a test case transaction is open.
+DATABASES["replica_test"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["replica_test"]["OPTIONS"] = {
+        "init_command": "PRAGMA read_uncommitted=1;"
+    }
+
+DATABASE_ROUTERS = ["marketplace.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICA_APPS = ["products", "accounts", "orders"]
+DATABASE_PIN_SECONDS = config("DB_PIN_SECONDS", default=5, cast=int)
+
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="marketplace"),
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
     }
 }
 
 
+# Cache backends every worker sees the same data in. Cached sessions and the
+# cached auth backend are only safe on one of these (see accounts.checks).
+SHARED_CACHE_BACKENDS = [
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.db.DatabaseCache",
+]
+SHARED_CACHE = CACHES["default"]["BACKEND"] in SHARED_CACHE_BACKENDS
+
+# With a shared cache, cached_db keeps sessions in the cache with the database
+# as a fallback; "django.contrib.sessions.backends.signed_cookies" avoids
+# server storage.
+SESSION_ENGINE = config(
+    "SESSION_ENGINE",
+    default=(
+        "django.contrib.sessions.backends.cached_db"
+        if SHARED_CACHE
+        else "django.contrib.sessions.backends.db"
+    ),
+)
+
+# With a shared cache, the cached backend loads request.user (and seller
+# profile) from the cache. ModelBackend stays listed so sessions created
+# without it stay valid.
+AUTHENTICATION_BACKENDS = ["django.contrib.auth.backends.ModelBackend"]
+if SHARED_CACHE:
+    AUTHENTICATION_BACKENDS.insert(0, "accounts.backends.CachedModelBackend")
+USER_CACHE_TIMEOUT = config("USER_CACHE_TIMEOUT", default=300, cast=int)
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -117,6 +230,49 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        )
+    },
+}
+
+# In development WhiteNoise serves files straight from the finders instead of
+# scanning STATIC_ROOT, which only exists after collectstatic.
+WHITENOISE_AUTOREFRESH = DEBUG
+WHITENOISE_USE_FINDERS = DEBUG
+
+if not DEBUG:
+    SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    SESSION_COOKIE_SECURE = config("SECURE_COOKIES", default=True, cast=bool)
+    CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+
+PAGE_CACHE_ENABLED = config("PAGE_CACHE_ENABLED", default=False, cast=bool)
+PAGE_CACHE_ALIAS = "default"
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=300, cast=int)
+PAGE_CACHE_LOCK_TIMEOUT = 10
+PAGE_CACHE_LOCK_WAIT = 2
+
+
+CART_RESERVATION_MINUTES = config("CART_RESERVATION_MINUTES", default=15, cast=int)
+
+
+# Write endpoints: repeated idempotency keys are replayed for IDEMPOTENCY_TTL
+# seconds, and each user/IP may make RATE_LIMITS requests per scope and window.
+# Both need a cache shared by all workers (see CACHE_BACKEND).
+IDEMPOTENCY_TTL = 600
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMITS = {
+    "cart": config("RATE_LIMIT_CART", default="30/m"),
+    "review": config("RATE_LIMIT_REVIEW", default="5/m"),
+}
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
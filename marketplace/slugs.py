@@ -0,0 +1,99 @@
+"""
+Slugs for Cyrillic names.
+
+Django's ``slugify`` drops characters it cannot fold to ASCII, so Ukrainian
+names all become empty slugs. ``slugify`` here transliterates first, using
+translation tables built once at import: Ukrainian follows the official 2010
+romanization (including the word-initial є/ї/й/ю/я forms), Russian the common
+passport style. Letters that exist only in the other alphabet still map.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.text import slugify as django_slugify
+
+_COMMON = {
+    "а": "a",
+    "б": "b",
+    "в": "v",
+    "д": "d",
+    "е": "e",
+    "ж": "zh",
+    "з": "z",
+    "к": "k",
+    "л": "l",
+    "м": "m",
+    "н": "n",
+    "о": "o",
+    "п": "p",
+    "р": "r",
+    "с": "s",
+    "т": "t",
+    "у": "u",
+    "ф": "f",
+    "х": "kh",
+    "ц": "ts",
+    "ч": "ch",
+    "ш": "sh",
+    "щ": "shch",
+    "ь": "",
+    "ъ": "",
+    "'": "",
+    "’": "",
+    "ʼ": "",
+}
+
+_UKRAINIAN = {
+    "г": "h",
+    "ґ": "g",
+    "є": "ie",
+    "и": "y",
+    "і": "i",
+    "ї": "i",
+    "й": "i",
+    "ю": "iu",
+    "я": "ia",
+    "ё": "io",
+    "ы": "y",
+    "э": "e",
+}
+
+_RUSSIAN = {
+    "г": "g",
+    "ґ": "g",
+    "є": "ye",
+    "и": "i",
+    "і": "i",
+    "ї": "yi",
+    "й": "y",
+    "ю": "yu",
+    "я": "ya",
+    "ё": "e",
+    "ы": "y",
+    "э": "e",
+}
+
+TABLES = {
+    "uk": str.maketrans({**_COMMON, **_UKRAINIAN}),
+    "ru": str.maketrans({**_COMMON, **_RUSSIAN}),
+}
+
+_UKRAINIAN_INITIAL = {"є": "ye", "ї": "yi", "й": "y", "ю": "yu", "я": "ya"}
+# Not after a letter or an apostrophe, which belongs to the word ("м'ясо")
+_WORD_INITIAL = re.compile(r"(?<![\w'’ʼ])[єїйюя]")
+
+
+def transliterate(value, language=None):
+    """Lowercase ``value`` and romanize its Cyrillic letters"""
+    language = (language or settings.LANGUAGE_CODE).split("-")[0]
+    value = str(value).lower()
+    if language == "ru":
+        return value.translate(TABLES["ru"])
+    value = _WORD_INITIAL.sub(lambda match: _UKRAINIAN_INITIAL[match[0]], value)
+    return value.translate(TABLES["uk"])
+
+
+def slugify(value, language=None):
+    """ASCII slug for ``value``, transliterating Ukrainian or Russian text"""
+    return django_slugify(transliterate(value, language))
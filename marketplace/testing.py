@@ -0,0 +1,122 @@
+"""
+Test helpers for keeping database query counts flat.
+
+``query_budget(n)`` fails when a block (or decorated test) runs more than
+``n`` queries and lists the SQL that ran. ``QueryBudgetMixin`` requests a URL
+after seeding 1, 10 and 100 objects and checks that the query count stays
+the same and within the budget declared for the URL name in ``query_budgets``.
+An unmeasured request runs before each measured one, so cache misses are
+not counted. ``create_seller``, ``seed_products`` and ``seed_customers``
+create the fixtures the test modules share.
+"""
+
+from contextlib import ContextDecorator
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from products.models import Product
+
+SEED_SIZES = (1, 10, 100)
+
+
+def create_seller(username="seller", **fields):
+    """A seller account that logs in with the password ``pass``"""
+    return User.objects.create_user(username, password="pass", is_seller=True, **fields)
+
+
+def seed_products(seller, count, **fields):
+    """Bulk-create numbered products of ``seller`` until there are ``count``"""
+    existing = Product.objects.count()
+    return Product.objects.bulk_create(
+        Product(
+            name=f"Товар {number}",
+            slug=f"product-{number}",
+            seller=seller,
+            price=number + 1,
+            stock=10,
+            **fields,
+        )
+        for number in range(existing, count)
+    )
+
+
+def seed_customers(products):
+    """Bulk-create one customer per product, e.g. to review it"""
+    return User.objects.bulk_create(
+        User(username=f"customer-{product.slug}") for product in products
+    )
+
+
+def format_queries(queries):
+    return "\n".join(
+        f"{number}. {query['sql']}" for number, query in enumerate(queries, start=1)
+    )
+
+
+class query_budget(ContextDecorator):
+    """Fail if more than ``budget`` queries run on ``using`` inside the block"""
+
+    def __init__(self, budget, using=DEFAULT_DB_ALIAS):
+        self.budget = budget
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and len(self.context) > self.budget:
+            raise AssertionError(
+                f"{len(self.context)} queries executed, budget is {self.budget}:\n"
+                f"{format_queries(self.context.captured_queries)}"
+            )
+        return False
+
+
+class QueryBudgetMixin:
+    """
+    For ``TestCase`` subclasses. ``query_budgets`` maps URL names to the most
+    queries a request may run; subclasses must define ``seed(count)``, which
+    brings the data the page shows up to ``count`` objects.
+    """
+
+    query_budgets = {}
+    seed_sizes = SEED_SIZES
+
+    @classmethod
+    def setUpClass(cls):
+        if not callable(getattr(cls, "seed", None)):
+            raise ImproperlyConfigured(
+                f"{cls.__name__} uses QueryBudgetMixin but does not define "
+                "seed(count) to create the objects its pages list."
+            )
+        super().setUpClass()
+
+    def assertQueriesFlat(self, url_name, *args, data=None, method="get", **kwargs):
+        """Request the URL at every seed size and compare the query counts"""
+        budget = self.query_budgets[url_name]
+        url = reverse(url_name, args=args, kwargs=kwargs)
+        counts = {}
+        for size in self.seed_sizes:
+            self.seed(size)
+            # Warm the session and user caches so only per-request queries count
+            getattr(self.client, method)(url, data)
+            with query_budget(budget) as context:
+                response = getattr(self.client, method)(url, data)
+            self.assertLess(response.status_code, 400, url)
+            counts[size] = context.captured_queries
+
+        smallest = counts[self.seed_sizes[0]]
+        for size, queries in counts.items():
+            if len(queries) != len(smallest):
+                self.fail(
+                    f"{url_name}: {len(smallest)} queries with "
+                    f"{self.seed_sizes[0]} objects but {len(queries)} with {size}:\n"
+                    f"{format_queries(queries)}"
+                )
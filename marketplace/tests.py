@@ -0,0 +1,280 @@
+import re
+from contextvars import Context
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.http import HttpResponse
+from django.middleware.csrf import _unmask_cipher_token, get_token
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from marketplace.db_router import (
+    PIN_COOKIE,
+    PrimaryPinningMiddleware,
+    routing_scope,
+)
+from marketplace.page_cache import (
+    add_page_cache_tags,
+    cache_anonymous_page,
+    invalidate_tags,
+    page_cache_key,
+)
+from marketplace.slugs import slugify, transliterate
+from marketplace.testing import QueryBudgetMixin, create_seller
+from marketplace.throttling import idempotent, rate_limit
+from products.models import Product
+
+
+@override_settings(DATABASE_REPLICAS=["replica_test"])
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    """
+    A ``TestCase`` transaction would pin every read to the primary, so these
+    run outside one against the ``replica_test`` mirror of the test database.
+    """
+
+    databases = {"default", "replica_test"}
+
+    def setUp(self):
+        seller = create_seller()
+        Product.objects.create(
+            name="Товар", slug="product", seller=seller, price=10, stock=1
+        )
+
+    def request(self, view, method="get", cookies=None):
+        """Run ``view`` through the pinning middleware, capturing each alias"""
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica_test"]) as replica:
+                response = PrimaryPinningMiddleware(view)(request)
+        return response, primary, replica
+
+    def read_products(self, request):
+        return HttpResponse(len(Product.objects.all()))
+
+    def write_products(self, request):
+        Product.objects.update(stock=3)
+        return HttpResponse()
+
+    def test_reads_go_to_replica(self):
+        response, primary, replica = self.request(self.read_products)
+        self.assertEqual(response.content, b"1")
+        self.assertEqual(len(primary), 0)
+        self.assertEqual(len(replica), 1)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_request_to_primary(self):
+        def write_then_read(request):
+            Product.objects.update(stock=2)
+            return HttpResponse(Product.objects.get().stock)
+
+        response, primary, replica = self.request(write_then_read)
+        self.assertEqual(response.content, b"2")
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(len(primary), 2)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_method_reads_from_primary(self):
+        response, primary, replica = self.request(self.read_products, method="post")
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(len(primary), 1)
+
+    def test_pin_cookie_keeps_next_request_on_primary(self):
+        response, _, _ = self.request(self.write_products)
+        cookies = {PIN_COOKIE: response.cookies[PIN_COOKIE].value}
+
+        response, primary, replica = self.request(self.read_products, cookies=cookies)
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(len(primary), 1)
+
+    def test_routing_scope_forgets_its_writes(self):
+        def command():
+            self.assertEqual(router.db_for_read(Product), "replica_test")
+            with routing_scope():
+                Product.objects.update(stock=2)
+                self.assertEqual(router.db_for_read(Product), "default")
+            self.assertEqual(router.db_for_read(Product), "replica_test")
+
+            # Without a scope a write pins the rest of the run
+            Product.objects.update(stock=3)
+            self.assertEqual(router.db_for_read(Product), "default")
+
+        # A fresh context, as setUp already wrote in this one
+        Context().run(command)
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+        self.view = cache_anonymous_page()(self.render_page)
+
+    def render_page(self, request):
+        self.renders += 1
+        add_page_cache_tags(request, "product:1")
+        response = HttpResponse(
+            f'<p>{self.renders}</p><input name="csrfmiddlewaretoken" '
+            f'value="{get_token(request)}">'
+        )
+        response["Content-Language"] = "uk"
+        response["Vary"] = "HX-Request"
+        return response
+
+    def get(self, view=None):
+        request = RequestFactory().get("/page/")
+        request.user = AnonymousUser()
+        return (view or self.view)(request), request
+
+    def test_miss_then_hit_keeps_headers(self):
+        first, _ = self.get()
+        second, _ = self.get()
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        self.assertEqual(self.renders, 1)
+        self.assertIn(b"<p>1</p>", second.content)
+        self.assertEqual(second["Content-Language"], "uk")
+        self.assertEqual(second["Vary"], "HX-Request")
+
+    def test_hit_gets_the_requesting_clients_csrf_token(self):
+        def secret(response):
+            token = re.search(rb'value="([^"]+)"', response.content)[1].decode()
+            return _unmask_cipher_token(token)
+
+        first, first_request = self.get()
+        second, second_request = self.get()
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        self.assertEqual(secret(first), first_request.META["CSRF_COOKIE"])
+        self.assertEqual(secret(second), second_request.META["CSRF_COOKIE"])
+        self.assertNotEqual(secret(first), secret(second))
+
+    def test_invalidated_tag_rerenders(self):
+        self.get()
+        invalidate_tags("product:1")
+        response, _ = self.get()
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertEqual(self.renders, 2)
+
+    def test_tag_invalidated_while_rendering_is_not_stored(self):
+        def render_then_change(request):
+            response = self.render_page(request)
+            # The product changes after the view read it but before it is stored
+            invalidate_tags("product:1")
+            return response
+
+        self.get(cache_anonymous_page()(render_then_change))
+        self.assertEqual(self.get()[0]["X-Page-Cache"], "miss")
+
+    def test_one_worker_renders_while_others_serve_stale(self):
+        self.get()
+        invalidate_tags("product:1")
+        request = RequestFactory().get("/page/")
+        cache.add(f"{page_cache_key(request)}:lock", 1)
+
+        response, _ = self.get()
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertIn(b"<p>1</p>", response.content)
+        self.assertEqual(self.renders, 1)
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={})
+class ThrottlingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def view(self, request):
+        self.calls += 1
+        return HttpResponse(f"call {self.calls}")
+
+    def post(self, view, key=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        request = RequestFactory().post("/", headers=headers)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_rate_limit_counts_per_window(self):
+        view = rate_limit("test", "2/m")(self.view)
+        statuses = [self.post(view).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.calls, 2)
+        self.assertLessEqual(int(self.post(view)["Retry-After"]), 60)
+
+    def test_rate_limit_slides_across_the_window_boundary(self):
+        view = rate_limit("test", "2/m")(self.view)
+
+        def post_at(seconds, count=1):
+            with mock.patch("marketplace.throttling.time.time", return_value=seconds):
+                return [self.post(view) for _ in range(count)]
+
+        self.assertEqual([r.status_code for r in post_at(60059, 2)], [200, 200])
+        # A fixed window would let two more through right after the boundary
+        [response] = post_at(60061)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "29")
+        # Half the previous window has slid out, which makes room for one
+        self.assertEqual([r.status_code for r in post_at(60090, 2)], [200, 429])
+        self.assertEqual(self.calls, 3)
+
+    def test_idempotent_replays_first_response(self):
+        view = idempotent()(self.view)
+        first = self.post(view, key="abc")
+        second = self.post(view, key="abc")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Idempotent-Replay"], "true")
+
+    def test_idempotent_rejects_key_in_progress(self):
+        def reentrant(request):
+            # A second request with the same key arrives while this one runs
+            return HttpResponse(self.post(view, key="abc").status_code)
+
+        view = idempotent()(reentrant)
+        self.assertEqual(self.post(view, key="abc").content, b"409")
+
+
+class SlugifyTests(SimpleTestCase):
+    def test_ukrainian(self):
+        cases = {
+            "Зубна щітка": "zubna-shchitka",
+            "Ялинкові іграшки": "yalynkovi-ihrashky",
+            "Їжак і йогурт": "yizhak-i-yohurt",
+            "Юний Євген": "yunyi-yevhen",
+            "Ґудзик": "gudzyk",
+        }
+        for name, slug in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(slugify(name, "uk"), slug)
+
+    def test_apostrophe_is_not_a_word_start(self):
+        cases = {"М'ясо": "miaso", "Подвір'я": "podviria", "Сім’я": "simia"}
+        for name, slug in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(slugify(name, "uk"), slug)
+
+    def test_russian(self):
+        self.assertEqual(slugify("Щётка для обуви", "ru"), "shchetka-dlya-obuvi")
+        self.assertEqual(transliterate("Яйцо", "ru"), "yaytso")
+
+    def test_default_language(self):
+        with self.settings(LANGUAGE_CODE="uk"):
+            self.assertEqual(slugify("Яблуко"), "yabluko")
+        self.assertEqual(slugify("Product 42"), "product-42")
+
+
+class QueryBudgetMixinTests(SimpleTestCase):
+    def test_seed_is_required(self):
+        class MissingSeedTests(QueryBudgetMixin, TestCase):
+            query_budgets = {"products:list": 4}
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "seed(count)"):
+            MissingSeedTests.setUpClass()
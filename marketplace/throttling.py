@@ -0,0 +1,157 @@
+"""
+Reusable guards for write endpoints.
+
+``idempotent`` replays the stored response when a POST repeats an
+``Idempotency-Key`` header or ``idempotency_key`` form field, so retries and
+double clicks are applied once. ``rate_limit`` counts requests per user (or
+client IP for anonymous requests) and scope over a sliding window.
+
+Both rely on the atomic ``cache.add`` and ``cache.incr``, so with several
+workers they only hold when the default cache is shared between them (Redis
+or Memcached); a per-process cache gives each worker its own keys and counts.
+"""
+
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+IDEMPOTENCY_FIELD = "idempotency_key"
+RATE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _client_id(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _parse_rate(rate):
+    count, unit = rate.split("/")
+    return int(count), RATE_UNITS[unit[0]]
+
+
+def idempotent(ttl=None):
+    """Apply a POST at most once per idempotency key within ``ttl`` seconds"""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get("Idempotency-Key") or request.POST.get(
+                IDEMPOTENCY_FIELD
+            )
+            if request.method != "POST" or not key:
+                return view_func(request, *args, **kwargs)
+
+            cache_key = f"idem:{view_func.__module__}.{view_func.__name__}:{_client_id(request)}:{key[:64]}"
+            timeout = ttl or getattr(settings, "IDEMPOTENCY_TTL", 600)
+
+            # Reserve the key before running the view, so only one of several
+            # concurrent requests with it can get past this point.
+            if not cache.add(cache_key, "in-progress", timeout):
+                stored = cache.get(cache_key)
+                if not isinstance(stored, dict):
+                    return HttpResponse(
+                        "Request is already being processed", status=409
+                    )
+                response = HttpResponse(stored["content"], status=stored["status"])
+                for header, value in stored["headers"].items():
+                    response[header] = value
+                response["Idempotent-Replay"] = "true"
+                return response
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+
+            if response.status_code >= 500 or response.streaming:
+                cache.delete(cache_key)
+            else:
+                headers = {
+                    header: response[header]
+                    for header in ("Content-Type", "Location")
+                    if response.has_header(header)
+                }
+                cache.set(
+                    cache_key,
+                    {
+                        "status": response.status_code,
+                        "content": response.content,
+                        "headers": headers,
+                    },
+                    timeout,
+                )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def rate_limit(scope, rate):
+    """
+    Sliding-window limit for unsafe requests, e.g. ``rate_limit("cart", "30/m")``
+    allows 30 requests in any minute. The rate can be overridden with
+    ``settings.RATE_LIMITS[scope]``.
+
+    Requests are counted per clock window with ``cache.add`` and ``cache.incr``
+    and the previous window's count is weighted by how much of it still falls
+    within the last period, so a client cannot send twice the limit across a
+    window boundary. Rejected requests are taken off the count again. The
+    counters are only atomic across workers on a shared cache.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in ("GET", "HEAD", "OPTIONS") or not getattr(
+                settings, "RATE_LIMIT_ENABLED", True
+            ):
+                return view_func(request, *args, **kwargs)
+
+            limit, period = _parse_rate(
+                getattr(settings, "RATE_LIMITS", {}).get(scope, rate)
+            )
+            now = time.time()
+            window, elapsed = divmod(now, period)
+            window = int(window)
+            key = f"ratelimit:{scope}:{_client_id(request)}"
+            cache_key = f"{key}:{window}"
+
+            # Each counter is read once more as the previous window
+            cache.add(cache_key, 0, 2 * period)
+            try:
+                count = cache.incr(cache_key)
+            except ValueError:
+                # The window's key expired between add() and incr()
+                cache.add(cache_key, 1, 2 * period)
+                count = 1
+            previous = cache.get(f"{key}:{window - 1}", 0)
+            overlap = 1 - elapsed / period
+            if previous * overlap + count > limit:
+                try:
+                    cache.decr(cache_key)
+                except ValueError:
+                    pass
+                # When the previous window has slid far enough out, or else
+                # when this one ends
+                if count <= limit and previous:
+                    free_at = (window + 1 - (limit - count) / previous) * period
+                else:
+                    free_at = (window + 1) * period
+                response = HttpResponse(
+                    "Забагато запитів. Спробуйте пізніше.", status=429
+                )
+                response["Retry-After"] = str(max(math.ceil(free_at - now), 1))
+                return response
+
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
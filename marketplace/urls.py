@@ -21,9 +21,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
 from django.shortcuts import render
-from django.urls import include, path
+from django.urls import include, path, register_converter
 
+from marketplace.page_cache import cache_anonymous_page
+from products.converters import UnicodeSlugConverter
 
+register_converter(UnicodeSlugConverter, "uslug")
+
+
+@cache_anonymous_page()
 def home(request):
     return render(request, "home.html")
 
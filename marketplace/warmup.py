@@ -0,0 +1,45 @@
+"""
+Work done once in the gunicorn master before workers are forked, so the
+loaded modules, URL resolver, translations and compiled templates are shared
+by all workers copy-on-write instead of being rebuilt in each of them.
+"""
+
+import gc
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import translation
+
+WARM_TEMPLATES = [
+    "home.html",
+    "products/product_list.html",
+    "products/product_grid.html",
+    "products/product_detail.html",
+    "products/_review_list.html",
+    "accounts/seller_store_view.html",
+    "orders/cart.html",
+    "orders/order_history.html",
+]
+
+
+def warm_up():
+    for language, _ in settings.LANGUAGES:
+        with translation.override(language):
+            reverse("home")
+
+    for name in WARM_TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    # Workers must open their own database connections.
+    connections.close_all()
+
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers don't touch (and copy) the shared pages.
+    gc.collect()
+    gc.freeze()
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import Order, OrderItem, PaymentMethod
+from .models import (
+    Order,
+    OrderItem,
+    PaymentMethod,
+    SellerDailySales,
+    SellerOrder,
+    StockReservation,
+)
 
 
 @admin.register(PaymentMethod)
@@ -13,3 +20,33 @@ class PaymentMethodAdmin(admin.ModelAdmin):
 
 admin.site.register(Order)
 admin.site.register(OrderItem)
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ["product", "order_item", "quantity", "expires_at"]
+    list_select_related = ["product", "order_item__product"]
+    ordering = ["expires_at"]
+
+
+@admin.register(SellerDailySales)
+class SellerDailySalesAdmin(admin.ModelAdmin):
+    list_display = ["day", "seller", "product", "units", "revenue", "orders"]
+    list_filter = ["day"]
+    list_select_related = ["seller", "product"]
+    ordering = ["-day"]
+
+
+@admin.register(SellerOrder)
+class SellerOrderAdmin(admin.ModelAdmin):
+    list_display = [
+        "order",
+        "seller",
+        "status",
+        "subtotal",
+        "items_count",
+        "created_at",
+    ]
+    list_filter = ["status"]
+    list_select_related = ["order__customer", "seller"]
+    ordering = ["-created_at"]
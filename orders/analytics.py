@@ -0,0 +1,125 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import OrderItem, SellerDailySales
+
+ANALYTICS_RANGES = [7, 30, 365]
+
+
+def _increment(seller_id, product_id, day, units, revenue, orders):
+    key = {"seller_id": seller_id, "product_id": product_id, "day": day}
+    changes = {
+        "units": F("units") + units,
+        "revenue": F("revenue") + revenue,
+        "orders": F("orders") + orders,
+    }
+    if SellerDailySales.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SellerDailySales.objects.create(
+                **key, units=units, revenue=revenue, orders=orders
+            )
+    except IntegrityError:
+        SellerDailySales.objects.filter(**key).update(**changes)
+
+
+def record_sales(order, items):
+    """Add a paid order's lines to the per-product and per-seller daily rollups"""
+    day = timezone.localdate(order.paid_at)
+    totals = defaultdict(lambda: [0, Decimal("0")])
+
+    for item in items:
+        seller_id = item.product.seller_id
+        revenue = item.unit_price * item.quantity
+        _increment(seller_id, item.product_id, day, item.quantity, revenue, 1)
+        totals[seller_id][0] += item.quantity
+        totals[seller_id][1] += revenue
+
+    for seller_id, (units, revenue) in totals.items():
+        _increment(seller_id, None, day, units, revenue, 1)
+
+
+def rebuild_sales(since=None):
+    """Recompute rollups from paid and shipped order lines, optionally from a day"""
+    day = TruncDate(Coalesce("order__paid_at", "order__created_at"))
+    lines = OrderItem.objects.filter(order__status__in=["paid", "shipped"]).annotate(
+        day=day
+    )
+    rollups = SellerDailySales.objects.all()
+    if since is not None:
+        lines = lines.filter(day__gte=since)
+        rollups = rollups.filter(day__gte=since)
+
+    revenue = Sum(
+        F("quantity") * F("unit_price"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    per_product = lines.values("product__seller", "product", "day").annotate(
+        units=Sum("quantity"), revenue=revenue, orders=Count("order", distinct=True)
+    )
+    per_seller = lines.values("product__seller", "day").annotate(
+        units=Sum("quantity"), revenue=revenue, orders=Count("order", distinct=True)
+    )
+
+    rows = [
+        SellerDailySales(
+            seller_id=row["product__seller"],
+            product_id=row.get("product"),
+            day=row["day"],
+            units=row["units"],
+            revenue=row["revenue"],
+            orders=row["orders"],
+        )
+        for query in (per_product.order_by(), per_seller.order_by())
+        for row in query.iterator()
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        SellerDailySales.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def sales_series(seller, days):
+    """
+    Daily (or, for a year, monthly) totals for the last ``days`` days, read
+    from the seller's total rollup rows only.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = SellerDailySales.objects.filter(
+        seller=seller, product__isnull=True, day__gte=start
+    ).values_list("day", "units", "revenue", "orders")
+    by_day = {day: (units, revenue, orders) for day, units, revenue, orders in rows}
+
+    buckets = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        label = day.strftime("%m.%Y") if days > 31 else day.strftime("%d.%m")
+        bucket = buckets.setdefault(
+            label, {"label": label, "units": 0, "revenue": Decimal("0"), "orders": 0}
+        )
+        units, revenue, orders = by_day.get(day, (0, 0, 0))
+        bucket["units"] += units
+        bucket["revenue"] += revenue
+        bucket["orders"] += orders
+
+    series = list(buckets.values())
+    peak = max((bucket["revenue"] for bucket in series), default=0)
+    for bucket in series:
+        bucket["percent"] = round(bucket["revenue"] * 100 / peak) if peak else 0
+
+    return {
+        "days": days,
+        "series": series,
+        "units": sum(bucket["units"] for bucket in series),
+        "revenue": sum(bucket["revenue"] for bucket in series),
+        "orders": sum(bucket["orders"] for bucket in series),
+    }
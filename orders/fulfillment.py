@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Order, OrderItem, SellerOrder
+
+FULFILLMENT_PAGE_SIZE = 50
+FULFILLMENT_STATUSES = ["paid", "shipped"]
+
+
+def split_order(order, items):
+    """
+    Create one paid sub-order per seller with a single bulk_create and link
+    the order's lines to them (and to their seller) with a single bulk_update,
+    capturing each line's unit price.
+    """
+    by_seller = defaultdict(list)
+    for item in items:
+        item.unit_price = item.product.price
+        by_seller[item.product.seller_id].append(item)
+
+    seller_orders = [
+        SellerOrder(
+            order=order,
+            seller_id=seller_id,
+            status="paid",
+            subtotal=sum(line.unit_price * line.quantity for line in lines),
+            items_count=len(lines),
+        )
+        for seller_id, lines in by_seller.items()
+    ]
+    with transaction.atomic():
+        SellerOrder.objects.bulk_create(seller_orders)
+        for seller_order in seller_orders:
+            for item in by_seller[seller_order.seller_id]:
+                item.seller_id = seller_order.seller_id
+                item.seller_order = seller_order
+                item.status = "paid"
+        OrderItem.objects.bulk_update(
+            items, ["seller", "seller_order", "status", "unit_price"]
+        )
+    return seller_orders
+
+
+def fulfillment_page(seller, status="paid", cursor=None):
+    """
+    One keyset page of the seller's order lines over the (seller, status, id)
+    index: oldest first for the shipping queue, newest first for shipped lines.
+    Returns the items and the cursor for the next page (or None).
+    """
+    items = OrderItem.objects.filter(seller=seller, status=status).select_related(
+        "product", "order__customer"
+    )
+    if status == "paid":
+        items = items.order_by("id")
+        if cursor:
+            items = items.filter(id__gt=cursor)
+    else:
+        items = items.order_by("-id")
+        if cursor:
+            items = items.filter(id__lt=cursor)
+
+    page = list(items[: FULFILLMENT_PAGE_SIZE + 1])
+    if len(page) > FULFILLMENT_PAGE_SIZE:
+        page = page[:FULFILLMENT_PAGE_SIZE]
+        return page, page[-1].id
+    return page, None
+
+
+def ship_items(seller, item_ids):
+    """
+    Mark the seller's paid lines as shipped with one UPDATE, then mark the
+    sub-orders and orders whose lines have all shipped. Returns the number of
+    lines shipped.
+    """
+    items = OrderItem.objects.filter(seller=seller, status="paid", id__in=item_ids)
+    with transaction.atomic():
+        order_ids = list(items.values_list("order_id", flat=True).distinct())
+        shipped = items.update(status="shipped")
+        SellerOrder.objects.filter(
+            order_id__in=order_ids, seller=seller, status="paid"
+        ).exclude(items__status="paid").update(status="shipped")
+        Order.objects.filter(id__in=order_ids, status="paid").exclude(
+            items__status="paid"
+        ).update(status="shipped")
+    return shipped
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.analytics import rebuild_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild seller daily sales rollups from paid and shipped orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only rebuild days starting from this date (YYYY-MM-DD)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        rows = rebuild_sales(since)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} sales rollup rows"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Release cart stock reservations whose TTL has expired"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of reservations deleted per query",
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired reservations")
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fold extra pending orders and repeated cart lines into the oldest one."""
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    duplicates = (
+        Order.objects.filter(status="pending")
+        .values("customer")
+        .annotate(orders=Count("id"), keep_id=Min("id"))
+        .filter(orders__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        extra = Order.objects.filter(
+            status="pending", customer=row["customer"]
+        ).exclude(id=row["keep_id"])
+        OrderItem.objects.filter(order__in=extra).update(order_id=row["keep_id"])
+        extra.delete()
+
+    repeated = (
+        OrderItem.objects.values("order", "product")
+        .annotate(lines=Count("id"), keep_id=Min("id"))
+        .filter(lines__gt=1)
+        .order_by()
+    )
+    for row in repeated:
+        lines = OrderItem.objects.filter(order=row["order"], product=row["product"])
+        total = sum(lines.values_list("quantity", flat=True))
+        lines.exclude(id=row["keep_id"]).delete()
+        OrderItem.objects.filter(id=row["keep_id"]).update(quantity=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_stockreservation"),
+        ("products", "0004_review_product_created_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "pending")),
+                fields=("customer",),
+                name="unique_pending_order_per_customer",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="orderitem",
+            constraint=models.UniqueConstraint(
+                fields=("order", "product"), name="unique_product_per_order"
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_seller_and_status(apps, schema_editor):
+    """Fill the new columns of existing lines from their product and order."""
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Order = apps.get_model("orders", "Order")
+    Product = apps.get_model("products", "Product")
+
+    OrderItem.objects.update(
+        seller_id=Subquery(
+            Product.objects.filter(id=OuterRef("product_id")).values("seller_id")[:1]
+        ),
+        status=Subquery(
+            Order.objects.filter(id=OuterRef("order_id")).values("status")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_sellerdailysales"),
+        ("products", "0006_category_price_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="seller",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sold_items",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("paid", "Paid"),
+                    ("shipped", "Shipped"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["seller", "status", "id"], name="orders_orde_seller__2537b7_idx"
+            ),
+        ),
+        migrations.RunPython(copy_seller_and_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+
+
+def split_existing_orders(apps, schema_editor):
+    """
+    Create one sub-order per (order, seller) of placed orders and link lines.
+    Subtotals are filled in by 0009 from the unit prices captured in 0008.
+    """
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    SellerOrder = apps.get_model("orders", "SellerOrder")
+
+    lines = OrderItem.objects.exclude(order__status="pending").filter(
+        seller_order__isnull=True, seller__isnull=False
+    )
+    groups = (
+        lines.values("order_id", "seller_id")
+        .annotate(
+            items_count=Count("id"),
+            unshipped=Count("id", filter=Q(status="paid")),
+        )
+        .order_by()
+    )
+    SellerOrder.objects.bulk_create(
+        (
+            SellerOrder(
+                order_id=group["order_id"],
+                seller_id=group["seller_id"],
+                status="paid" if group["unshipped"] else "shipped",
+                items_count=group["items_count"],
+            )
+            for group in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+    lines.update(
+        seller_order_id=Subquery(
+            SellerOrder.objects.filter(
+                order_id=OuterRef("order_id"), seller_id=OuterRef("seller_id")
+            ).values("id")[:1]
+        )
+    )
+    # auto_now_add stamped the migration time; keep the original order date.
+    SellerOrder.objects.update(
+        created_at=Subquery(
+            Order.objects.filter(id=OuterRef("order_id")).values("created_at")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_orderitem_seller_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SellerOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("paid", "Paid"),
+                            ("shipped", "Shipped"),
+                        ],
+                        default="paid",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "subtotal",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("items_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_orders",
+                        to="orders.order",
+                    ),
+                ),
+                (
+                    "seller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_orders",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Замовлення продавця",
+                "verbose_name_plural": "Замовлення продавців",
+            },
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="seller_order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="items",
+                to="orders.sellerorder",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sellerorder",
+            index=models.Index(
+                fields=["seller", "status"], name="orders_sell_seller__7060a8_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sellerorder",
+            constraint=models.UniqueConstraint(
+                fields=("order", "seller"), name="unique_seller_order"
+            ),
+        ),
+        migrations.RunPython(split_existing_orders, migrations.RunPython.noop),
+    ]
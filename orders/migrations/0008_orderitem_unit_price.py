@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:11
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def capture_unit_prices(apps, schema_editor):
+    """
+    Placed lines from before the column existed get the product's price as of
+    this migration, the closest record there is of what was paid.
+    """
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Product = apps.get_model("products", "Product")
+
+    OrderItem.objects.exclude(order__status="pending").filter(
+        unit_price__isnull=True
+    ).update(
+        unit_price=Subquery(
+            Product.objects.filter(id=OuterRef("product_id")).values("price")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_seller_orders"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.RunPython(capture_unit_prices, migrations.RunPython.noop),
+    ]
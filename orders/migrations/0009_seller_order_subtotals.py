@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def recompute_subtotals(apps, schema_editor):
+    """Sum each sub-order's lines at the unit prices captured at checkout."""
+    OrderItem = apps.get_model("orders", "OrderItem")
+    SellerOrder = apps.get_model("orders", "SellerOrder")
+
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    subtotals = (
+        OrderItem.objects.filter(seller_order_id=OuterRef("id"))
+        .values("seller_order_id")
+        .annotate(subtotal=Sum(F("quantity") * F("unit_price"), output_field=amount))
+        .values("subtotal")
+    )
+    SellerOrder.objects.update(
+        subtotal=Coalesce(Subquery(subtotals), Value(0), output_field=amount)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_orderitem_unit_price"),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_subtotals, migrations.RunPython.noop),
+    ]
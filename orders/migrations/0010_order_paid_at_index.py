@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0009_seller_order_subtotals"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
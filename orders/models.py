@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 from accounts.models import User
 from products.models import Product
@@ -21,6 +21,27 @@ class PaymentMethod(models.Model):
         return self.name
 
 
+ORDER_STATUSES = [("pending", "Pending"), ("paid", "Paid"), ("shipped", "Shipped")]
+
+
+class OrderManager(models.Manager):
+    def cart_for(self, customer):
+        """
+        Return the customer's pending order, creating it if needed. Safe under
+        concurrent requests: the partial unique constraint rejects a second
+        pending order and the loser re-fetches the winner's row.
+        """
+        try:
+            return self.get(customer=customer, status="pending")
+        except self.model.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                return self.create(customer=customer, status="pending")
+        except IntegrityError:
+            return self.get(customer=customer, status="pending")
+
+
 class Order(models.Model):
     customer = models.ForeignKey(
         User, on_delete=models.CASCADE, limit_choices_to={"is_seller": False}
@@ -29,20 +50,148 @@ class Order(models.Model):
         PaymentMethod, on_delete=models.SET_NULL, null=True, blank=True
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(
-        max_length=20,
-        choices=[("pending", "Pending"), ("paid", "Paid"), ("shipped", "Shipped")],
-        default="pending",
-    )
+    status = models.CharField(max_length=20, choices=ORDER_STATUSES, default="pending")
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = OrderManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer"],
+                condition=models.Q(status="pending"),
+                name="unique_pending_order_per_customer",
+            )
+        ]
 
     def __str__(self):
         return f"Order #{self.id} by {self.customer.username}"
 
 
+class SellerOrder(models.Model):
+    """The part of a customer's order fulfilled by one seller"""
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="seller_orders"
+    )
+    seller = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="seller_orders"
+    )
+    status = models.CharField(max_length=20, choices=ORDER_STATUSES, default="paid")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Замовлення продавця"
+        verbose_name_plural = "Замовлення продавців"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "seller"], name="unique_seller_order"
+            )
+        ]
+        indexes = [models.Index(fields=["seller", "status"])]
+
+    def __str__(self):
+        return f"Order #{self.order_id} / seller {self.seller_id}"
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Copied from the product at checkout so the seller's queue needs no joins.
+    seller = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="sold_items",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=20, choices=ORDER_STATUSES, default="pending")
+    seller_order = models.ForeignKey(
+        SellerOrder,
+        on_delete=models.SET_NULL,
+        related_name="items",
+        null=True,
+        blank=True,
+    )
+    # Price the customer paid, captured at checkout; empty for cart lines.
+    unit_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "product"], name="unique_product_per_order"
+            )
+        ]
+        indexes = [models.Index(fields=["seller", "status", "id"])]
 
     def __str__(self):
         return f"{self.product.name} x{self.quantity}"
+
+    @property
+    def price(self):
+        """Captured price of a placed line, the current product price in a cart"""
+        return self.product.price if self.unit_price is None else self.unit_price
+
+
+class StockReservation(models.Model):
+    order_item = models.OneToOneField(
+        OrderItem, on_delete=models.CASCADE, related_name="reservation"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Резерв товару"
+        verbose_name_plural = "Резерви товарів"
+        indexes = [models.Index(fields=["product", "expires_at"])]
+
+    def __str__(self):
+        return f"{self.product_id} x{self.quantity} until {self.expires_at}"
+
+
+class SellerDailySales(models.Model):
+    """
+    Daily sales rollup per seller and product, maintained at checkout.
+    Rows with an empty product hold the seller's totals for the day.
+    """
+
+    seller = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="daily_sales",
+        null=True,
+        blank=True,
+    )
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Денні продажі"
+        verbose_name_plural = "Денні продажі"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["seller", "product", "day"],
+                name="unique_daily_sales_per_product",
+            ),
+            models.UniqueConstraint(
+                fields=["seller", "day"],
+                condition=models.Q(product__isnull=True),
+                name="unique_daily_sales_total",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} {self.day}: {self.units} units"
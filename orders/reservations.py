@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from marketplace.page_cache import CATALOG_TAG, invalidate_tags, product_tag, seller_tag
+from products.models import Product
+
+from .models import StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product, available):
+        self.product = product
+        self.available = available
+        super().__init__(f"Only {available} units of product {product.id} available")
+
+
+def reservation_ttl():
+    return timedelta(minutes=getattr(settings, "CART_RESERVATION_MINUTES", 15))
+
+
+def reserved_quantity(product_id, exclude_item=None):
+    """Sum of active reservations for a product (served by the expiry index)"""
+    reservations = StockReservation.objects.filter(
+        product_id=product_id, expires_at__gt=timezone.now()
+    )
+    if exclude_item is not None:
+        reservations = reservations.exclude(order_item=exclude_item)
+    return reservations.aggregate(total=Sum("quantity"))["total"] or 0
+
+
+def available_stock(product, exclude_item=None):
+    return max(product.stock - reserved_quantity(product.id, exclude_item), 0)
+
+
+def reserve_stock(item, quantity):
+    """
+    Hold ``quantity`` units of the item's product until the reservation TTL
+    runs out. The product row is locked only for the duration of this short
+    transaction, so concurrent carts cannot reserve more than is in stock.
+    """
+    with transaction.atomic():
+        product = (
+            Product.objects.select_for_update()
+            .only("id", "stock")
+            .get(id=item.product_id)
+        )
+        available = available_stock(product, exclude_item=item)
+        if quantity > available:
+            raise InsufficientStock(product, available)
+        StockReservation.objects.update_or_create(
+            order_item=item,
+            defaults={
+                "product_id": item.product_id,
+                "quantity": quantity,
+                "expires_at": timezone.now() + reservation_ttl(),
+            },
+        )
+
+
+def commit_reservations(order, items):
+    """
+    Turn the order's reservations into stock decrements. Expired reservations
+    are renewed first; raises InsufficientStock if that is no longer possible.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for item in sorted(items, key=lambda item: item.product_id):
+            reservation = getattr(item, "reservation", None)
+            if (
+                reservation is None
+                or reservation.expires_at <= now
+                or reservation.quantity != item.quantity
+            ):
+                reserve_stock(item, item.quantity)
+
+            updated = Product.objects.filter(
+                id=item.product_id, stock__gte=item.quantity
+            ).update(stock=F("stock") - item.quantity, updated_at=now)
+            if not updated:
+                # Report what is left now, not what the cart loaded earlier
+                item.product.refresh_from_db(fields=["stock"])
+                raise InsufficientStock(item.product, item.product.stock)
+
+        StockReservation.objects.filter(order_item__order=order).delete()
+
+        # Stock changed, so catalog pages that show availability are stale
+        # too; wait for the commit so a re-render cannot cache the old stock
+        tags = [
+            CATALOG_TAG,
+            *{product_tag(item.product_id) for item in items},
+            *{seller_tag(item.product.seller_id) for item in items},
+        ]
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def release_expired_reservations(batch_size=1000):
+    """Delete expired reservations in batches, returning how many were removed"""
+    released = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(expires_at__lte=timezone.now())
+            .order_by("expires_at")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        released += StockReservation.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,18 @@
+import uuid
+
+from django import template
+from django.utils.html import format_html
+
+from marketplace.throttling import IDEMPOTENCY_FIELD
+
+register = template.Library()
+
+
+@register.simple_tag
+def idempotency_field():
+    """Hidden input with a fresh key, so resubmitting the same form is a no-op"""
+    return format_html(
+        '<input type="hidden" name="{}" value="{}">',
+        IDEMPOTENCY_FIELD,
+        uuid.uuid4().hex,
+    )
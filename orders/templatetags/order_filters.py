@@ -16,6 +16,6 @@ def multiply(value, arg):
 def sum_total(items):
 
     try:
-        return sum(item.product.price * item.quantity for item in items)
+        return sum(item.price * item.quantity for item in items)
     except (ValueError, TypeError):
         return 0
@@ -1 +1,313 @@
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from marketplace.page_cache import CATALOG_TAG, _tag_versions
+from marketplace.testing import QueryBudgetMixin, create_seller, seed_products
+from orders.analytics import rebuild_sales
+from orders.fulfillment import ship_items, split_order
+from orders.models import (
+    Order,
+    OrderItem,
+    PaymentMethod,
+    SellerDailySales,
+    SellerOrder,
+    StockReservation,
+)
+from orders.reservations import (
+    InsufficientStock,
+    available_stock,
+    commit_reservations,
+    release_expired_reservations,
+    reserve_stock,
+)
+from products.models import Product
+
+
+class OrderQueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "orders:cart": 5,
+        "orders:order_history": 5,
+        "orders:order_detail": 4,
+        "orders:fulfillment": 4,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.customer = User.objects.create_user("customer", password="pass")
+        PaymentMethod.objects.create(name="Картка")
+        cls.cart = Order.objects.create(customer=cls.customer)
+        cls.order = Order.objects.create(
+            customer=cls.customer, status="paid", paid_at=timezone.now()
+        )
+        cls.seller_order = SellerOrder.objects.create(
+            order=cls.order, seller=cls.seller
+        )
+
+    def seed(self, count):
+        """Bring cart lines, paid lines of one order and paid orders to count"""
+        products = seed_products(self.seller, count)
+        orders = Order.objects.bulk_create(
+            Order(customer=self.customer, status="paid", paid_at=timezone.now())
+            for _ in products[1:]
+        )
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=self.cart, product=product) for product in products]
+            + [
+                OrderItem(
+                    order=self.order,
+                    product=product,
+                    seller=self.seller,
+                    seller_order=self.seller_order,
+                    status="paid",
+                )
+                for product in products
+            ]
+            + [
+                OrderItem(
+                    order=order, product=product, seller=self.seller, status="paid"
+                )
+                for order, product in zip(orders, products[1:])
+            ]
+        )
+
+    def test_cart(self):
+        self.client.force_login(self.customer)
+        self.assertQueriesFlat("orders:cart")
+
+    def test_order_history(self):
+        self.client.force_login(self.customer)
+        self.assertQueriesFlat("orders:order_history")
+
+    def test_order_detail(self):
+        self.client.force_login(self.customer)
+        self.assertQueriesFlat("orders:order_detail", self.order.id)
+
+    def test_fulfillment_queue(self):
+        self.client.force_login(self.seller)
+        self.assertQueriesFlat("orders:fulfillment")
+
+
+class CartTests(TestCase):
+    def test_cart_for_returns_the_cart_created_concurrently(self):
+        customer = User.objects.create_user("customer", password="pass")
+        existing = Order.objects.create(customer=customer)
+        get = Order.objects.get
+        misses = [Order.DoesNotExist]
+
+        def racing_get(**lookup):
+            # The other request's cart commits between our lookup and insert
+            if misses:
+                raise misses.pop()
+            return get(**lookup)
+
+        with mock.patch.object(Order.objects, "get", side_effect=racing_get):
+            cart = Order.objects.cart_for(customer)
+
+        self.assertEqual(cart, existing)
+        self.assertEqual(Order.objects.filter(customer=customer).count(), 1)
+
+
+class ReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.product = Product.objects.create(
+            name="Товар", slug="product", seller=cls.seller, price=10, stock=5
+        )
+
+    def add_item(self, quantity):
+        """A cart line for a new customer, since each customer has one cart"""
+        customer = User.objects.create_user(f"customer-{User.objects.count()}")
+        order = Order.objects.create(customer=customer)
+        return OrderItem.objects.create(
+            order=order, product=self.product, quantity=quantity
+        )
+
+    def test_reserve_more_than_available(self):
+        reserve_stock(self.add_item(3), 3)
+        item = self.add_item(3)
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(item, 3)
+        self.assertEqual(raised.exception.available, 2)
+        self.assertFalse(StockReservation.objects.filter(order_item=item).exists())
+
+    def test_expired_reservations_are_released(self):
+        item = self.add_item(5)
+        reserve_stock(item, 5)
+        self.assertEqual(available_stock(self.product), 0)
+
+        StockReservation.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(available_stock(self.product), 5)
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_commit_decrements_stock_and_invalidates_catalog(self):
+        item = self.add_item(2)
+        reserve_stock(item, 2)
+        catalog_version = _tag_versions([CATALOG_TAG])[CATALOG_TAG]
+
+        items = list(item.order.items.select_related("product", "reservation"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            commit_reservations(item.order, items)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(StockReservation.objects.exists())
+        # Invalidation waits for the commit
+        self.assertEqual(_tag_versions([CATALOG_TAG])[CATALOG_TAG], catalog_version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(_tag_versions([CATALOG_TAG])[CATALOG_TAG], catalog_version)
+
+    def test_commit_fails_when_stock_went_short(self):
+        item = self.add_item(4)
+        reserve_stock(item, 4)
+        # Reservation lapsed and the stock was sold elsewhere in the meantime
+        StockReservation.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+
+        items = list(item.order.items.select_related("product", "reservation"))
+        with self.assertRaises(InsufficientStock) as raised:
+            commit_reservations(item.order, items)
+        self.assertEqual(raised.exception.available, 1)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(StockReservation.objects.get().quantity, 4)
+
+
+class CheckoutPriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.customer = User.objects.create_user("customer", password="pass")
+        cls.product = Product.objects.create(
+            name="Товар", slug="product", seller=cls.seller, price=10, stock=5
+        )
+
+    def test_checkout_captures_unit_price(self):
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2)
+        self.client.force_login(self.customer)
+        self.client.post(reverse("orders:checkout"))
+
+        Product.objects.filter(pk=self.product.pk).update(price=99)
+        item = OrderItem.objects.get()
+        self.assertEqual(item.unit_price, 10)
+        self.assertEqual(item.price, 10)
+
+        rebuild_sales()
+        totals = SellerDailySales.objects.get(product__isnull=True)
+        self.assertEqual(totals.revenue, 20)
+
+    def test_concurrent_checkout_is_applied_once(self):
+        order = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2)
+        stale = Order.objects.get(pk=order.pk)
+        # Another request paid the cart after this one loaded it
+        Order.objects.filter(pk=order.pk).update(status="paid")
+
+        self.client.force_login(self.customer)
+        with mock.patch("orders.views.Order.objects.get", return_value=stale):
+            response = self.client.post(reverse("orders:checkout"))
+
+        self.assertRedirects(response, reverse("orders:order_detail", args=[order.id]))
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 5)
+        self.assertFalse(SellerOrder.objects.exists())
+
+
+class FulfillmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer", password="pass")
+        cls.sellers = [create_seller(f"seller-{number}") for number in range(2)]
+        cls.products = [
+            Product.objects.create(
+                name=f"Товар {number}",
+                slug=f"product-{number}",
+                seller=seller,
+                price=price,
+                stock=10,
+            )
+            for number, (seller, price) in enumerate(
+                [(cls.sellers[0], 10), (cls.sellers[0], 15), (cls.sellers[1], 25)]
+            )
+        ]
+
+    def place_order(self):
+        """A paid order with two lines of the first seller and one of the second"""
+        order = Order.objects.create(
+            customer=self.customer, status="paid", paid_at=timezone.now()
+        )
+        items = [
+            OrderItem.objects.create(order=order, product=product, quantity=quantity)
+            for product, quantity in zip(self.products, [2, 1, 3])
+        ]
+        split_order(order, items)
+        return order, items
+
+    def test_shipping_every_line_ships_the_order(self):
+        order, items = self.place_order()
+        first, second = self.sellers
+
+        self.assertEqual(ship_items(first, [items[0].id, items[1].id]), 2)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "paid")
+
+        self.assertEqual(ship_items(second, [items[2].id]), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "shipped")
+
+    def test_seller_cannot_ship_another_sellers_lines(self):
+        order, items = self.place_order()
+
+        self.assertEqual(ship_items(self.sellers[0], [items[2].id]), 0)
+        self.assertEqual(OrderItem.objects.get(pk=items[2].pk).status, "paid")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "paid")
+
+    def test_split_creates_one_paid_sub_order_per_seller(self):
+        order, items = self.place_order()
+        first, second = self.sellers
+
+        self.assertEqual(
+            {
+                sub_order.seller_id: (
+                    sub_order.status,
+                    sub_order.items_count,
+                    sub_order.subtotal,
+                )
+                for sub_order in order.seller_orders.all()
+            },
+            {first.id: ("paid", 2, 35), second.id: ("paid", 1, 75)},
+        )
+        lines = OrderItem.objects.filter(order=order).select_related(
+            "product", "seller_order"
+        )
+        for item in lines:
+            self.assertEqual(item.seller_id, item.product.seller_id)
+            self.assertEqual(item.seller_order.seller_id, item.product.seller_id)
+            self.assertEqual(
+                (item.status, item.unit_price), ("paid", item.product.price)
+            )
+
+    def test_sub_order_ships_with_its_sellers_lines(self):
+        order, items = self.place_order()
+        first, second = self.sellers
+
+        ship_items(first, [items[0].id])
+        self.assertEqual(SellerOrder.objects.get(seller=first).status, "paid")
+
+        ship_items(first, [items[1].id])
+        statuses = dict(order.seller_orders.values_list("seller", "status"))
+        self.assertEqual(statuses, {first.id: "shipped", second.id: "paid"})
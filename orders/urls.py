@@ -20,4 +20,5 @@ urlpatterns = [
     path("checkout/", views.checkout, name="checkout"),
     path("order/<int:order_id>/", views.order_detail, name="order_detail"),
     path("history/", views.order_history, name="order_history"),
+    path("fulfillment/", views.fulfillment_queue, name="fulfillment"),
 ]
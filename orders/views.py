@@ -1,14 +1,29 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
+from marketplace.throttling import idempotent, rate_limit
 from products.models import Product
+from products.permissions import require_seller
 
+from .analytics import record_sales
 from .forms import PaymentMethodForm
+from .fulfillment import (
+    FULFILLMENT_STATUSES,
+    fulfillment_page,
+    ship_items,
+    split_order,
+)
 from .models import Order, OrderItem, PaymentMethod
+from .reservations import InsufficientStock, commit_reservations, reserve_stock
 
 
+@idempotent()
+@rate_limit("cart", "30/m")
 def add_to_cart(request, product_id):
     """Add a product to the user's cart"""
     if not request.user.is_authenticated:
@@ -29,15 +44,7 @@ def add_to_cart(request, product_id):
         messages.error(request, "Кількість повинна бути більше 0.")
         return redirect("products:detail", slug=product.slug)
 
-    if quantity > product.stock:
-        messages.error(
-            request, f"На складі доступно лише {product.stock} одиниць цього товару."
-        )
-        return redirect("products:detail", slug=product.slug)
-
-    order, created = Order.objects.get_or_create(
-        customer=request.user, status="pending", defaults={"status": "pending"}
-    )
+    order = Order.objects.cart_for(request.user)
 
     if payment_method_id:
         try:
@@ -49,20 +56,24 @@ def add_to_cart(request, product_id):
         except PaymentMethod.DoesNotExist:
             messages.warning(request, "Обраний спосіб оплати недоступний.")
 
-    order_item, created = OrderItem.objects.get_or_create(
-        order=order, product=product, defaults={"quantity": quantity}
-    )
+    try:
+        with transaction.atomic():
+            order_item, created = OrderItem.objects.get_or_create(
+                order=order, product=product, defaults={"quantity": quantity}
+            )
+            if not created:
+                OrderItem.objects.filter(id=order_item.id).update(
+                    quantity=F("quantity") + quantity
+                )
+                order_item.refresh_from_db(fields=["quantity"])
+            reserve_stock(order_item, order_item.quantity)
+    except InsufficientStock as exc:
+        messages.error(
+            request, f"На складі доступно лише {exc.available} одиниць цього товару."
+        )
+        return redirect("products:detail", slug=product.slug)
 
     if not created:
-        new_quantity = order_item.quantity + quantity
-        if new_quantity > product.stock:
-            messages.error(
-                request,
-                f"Загальна кількість не може перевищувати {product.stock} одиниць.",
-            )
-            return redirect("products:detail", slug=product.slug)
-        order_item.quantity = new_quantity
-        order_item.save()
         messages.success(
             request, f"Кількість товару '{product.name}' оновлено в кошику."
         )
@@ -81,7 +92,7 @@ def cart_view(request):
 
     try:
         order = Order.objects.get(customer=request.user, status="pending")
-        items = order.items.all()
+        items = order.items.select_related("product")
         total = sum(item.product.price * item.quantity for item in items)
     except Order.DoesNotExist:
         order = None
@@ -102,6 +113,8 @@ def cart_view(request):
 
 
 @login_required
+@idempotent()
+@rate_limit("cart", "30/m")
 def update_cart_item(request, item_id):
     """Update quantity of an item in the cart"""
     if request.user.is_seller:
@@ -115,15 +128,21 @@ def update_cart_item(request, item_id):
     if quantity <= 0:
         item.delete()
         messages.success(request, f"Товар '{item.product.name}' видалено з кошика.")
-    elif quantity > item.product.stock:
-        messages.error(
-            request,
-            f"На складі доступно лише {item.product.stock} одиниць цього товару.",
-        )
     else:
-        item.quantity = quantity
-        item.save()
-        messages.success(request, f"Кількість товару '{item.product.name}' оновлено.")
+        try:
+            with transaction.atomic():
+                item.quantity = quantity
+                item.save()
+                reserve_stock(item, quantity)
+        except InsufficientStock as exc:
+            messages.error(
+                request,
+                f"На складі доступно лише {exc.available} одиниць цього товару.",
+            )
+        else:
+            messages.success(
+                request, f"Кількість товару '{item.product.name}' оновлено."
+            )
 
     return redirect("orders:cart")
 
@@ -153,28 +172,34 @@ def checkout(request):
 
     try:
         order = Order.objects.get(customer=request.user, status="pending")
-        items = order.items.all()
+        items = list(order.items.select_related("product", "reservation"))
 
         if not items:
             messages.error(request, "Ваш кошик порожній.")
             return redirect("orders:cart")
 
-        for item in items:
-            if item.quantity > item.product.stock:
-                messages.error(
-                    request,
-                    f"Товар '{item.product.name}' недоступний у такій кількості.",
+        try:
+            with transaction.atomic():
+                # Only one of two concurrent checkouts of the cart gets the row
+                paid_at = timezone.now()
+                claimed = Order.objects.filter(pk=order.pk, status="pending").update(
+                    status="paid", paid_at=paid_at
                 )
-                return redirect("orders:cart")
-
-        for item in items:
-            item.product.stock -= item.quantity
-            item.product.save()
-
-        order.status = "paid"
-        order.save()
+                if not claimed:
+                    messages.info(request, "Це замовлення вже оформлено.")
+                    return redirect("orders:order_detail", order_id=order.id)
+                order.status, order.paid_at = "paid", paid_at
+                commit_reservations(order, items)
+                split_order(order, items)
+                record_sales(order, items)
+        except InsufficientStock as exc:
+            messages.error(
+                request,
+                f"Товар '{exc.product.name}' недоступний у такій кількості.",
+            )
+            return redirect("orders:cart")
 
-        total = sum(item.product.price * item.quantity for item in items)
+        total = sum(item.unit_price * item.quantity for item in items)
         messages.success(
             request, f"Замовлення на суму {total:.2f} грн успішно оформлено!"
         )
@@ -190,8 +215,8 @@ def checkout(request):
 def order_detail(request, order_id):
     """Display order details"""
     order = get_object_or_404(Order, id=order_id, customer=request.user)
-    items = order.items.all()
-    total = sum(item.product.price * item.quantity for item in items)
+    items = order.items.select_related("product")
+    total = sum(item.price * item.quantity for item in items)
 
     context = {
         "order": order,
@@ -211,6 +236,7 @@ def order_history(request):
     orders = (
         Order.objects.filter(customer=request.user)
         .exclude(status="pending")
+        .prefetch_related("items__product")
         .order_by("-created_at")
     )
 
@@ -218,3 +244,37 @@ def order_history(request):
         "orders": orders,
     }
     return render(request, "orders/order_history.html", context)
+
+
+@login_required
+def fulfillment_queue(request):
+    """Seller's order lines waiting for shipment, with bulk 'mark shipped'"""
+    require_seller(request.user)
+
+    if request.method == "POST":
+        item_ids = [
+            int(item_id)
+            for item_id in request.POST.getlist("items")
+            if item_id.isdigit()
+        ]
+        shipped = ship_items(request.user, item_ids)
+        if shipped:
+            messages.success(request, f"Позначено як відправлені: {shipped}.")
+        else:
+            messages.error(request, "Оберіть товари для відправлення.")
+        return redirect("orders:fulfillment")
+
+    status = request.GET.get("status")
+    if status not in FULFILLMENT_STATUSES:
+        status = "paid"
+    cursor = request.GET.get("after", "")
+    items, next_cursor = fulfillment_page(
+        request.user, status, int(cursor) if cursor.isdigit() else None
+    )
+
+    context = {
+        "items": items,
+        "status": status,
+        "next_cursor": next_cursor,
+    }
+    return render(request, "orders/fulfillment_queue.html", context)
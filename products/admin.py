@@ -1,6 +1,18 @@
 from django.contrib import admin
 
-from .models import Category, Product, Review
+from .models import (
+    Category,
+    CategoryPriceStats,
+    PriceChange,
+    PriceChangeBatch,
+    PriceRule,
+    Product,
+    ProductRecommendation,
+    Review,
+    ScheduledChange,
+    WishlistAlert,
+    WishlistItem,
+)
 
 
 @admin.register(Category)
@@ -33,3 +45,64 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ["product__name", "user__username", "comment"]
     readonly_fields = ["created_at", "updated_at"]
     list_editable = ["rating"]
+
+
+@admin.register(CategoryPriceStats)
+class CategoryPriceStatsAdmin(admin.ModelAdmin):
+    list_display = ["category", "product_count", "min_price", "max_price", "updated_at"]
+    list_select_related = ["category"]
+    readonly_fields = ["updated_at"]
+
+
+@admin.register(ProductRecommendation)
+class ProductRecommendationAdmin(admin.ModelAdmin):
+    list_display = ["product", "recommended", "orders", "rank"]
+    list_select_related = ["product", "recommended"]
+    raw_id_fields = ["product", "recommended"]
+    ordering = ["product", "rank"]
+
+
+class PriceChangeInline(admin.TabularInline):
+    model = PriceChange
+    raw_id_fields = ["product"]
+    extra = 0
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ["name", "seller", "category", "action", "value", "rounding"]
+    list_filter = ["action", "rounding"]
+    list_select_related = ["seller", "category"]
+    search_fields = ["name", "seller__username"]
+
+
+@admin.register(PriceChangeBatch)
+class PriceChangeBatchAdmin(admin.ModelAdmin):
+    list_display = ["seller", "created_at", "products_count", "rolled_back_at"]
+    list_select_related = ["seller"]
+    readonly_fields = ["created_at"]
+    inlines = [PriceChangeInline]
+
+
+@admin.register(ScheduledChange)
+class ScheduledChangeAdmin(admin.ModelAdmin):
+    list_display = ["product", "action", "price", "due_at", "applied_at"]
+    list_filter = ["action", "applied_at"]
+    list_select_related = ["product"]
+    raw_id_fields = ["product"]
+    readonly_fields = ["created_at"]
+
+
+@admin.register(WishlistItem)
+class WishlistItemAdmin(admin.ModelAdmin):
+    list_display = ["user", "product", "price", "in_stock", "created_at"]
+    list_select_related = ["user", "product"]
+    raw_id_fields = ["user", "product"]
+
+
+@admin.register(WishlistAlert)
+class WishlistAlertAdmin(admin.ModelAdmin):
+    list_display = ["user", "product", "kind", "old_price", "new_price", "created_at"]
+    list_filter = ["kind", "created_at"]
+    list_select_related = ["user", "product"]
+    raw_id_fields = ["user", "product"]
@@ -0,0 +1,195 @@
+"""
+Prefix index for search-as-you-type.
+
+The index is a sorted list of ``(key, kind, label, slug)`` tuples, one per
+word suffix of every active product, category and store name, in both the
+original script and its transliteration. It is split into shards by the first
+``AUTOCOMPLETE_MIN_LENGTH`` characters of the key, which is all a lookup
+needs, so no single cache value grows with the catalog past memcached's 1 MB
+item limit. A lookup is a binary search plus a short forward scan of one
+shard. The built shards are shared between workers through the cache and
+memoized per process until a name changes. After a change one worker
+rebuilds them under a ``cache.add`` lock while the others keep serving the
+previous shards.
+"""
+
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from accounts.models import SellerProfile
+from marketplace.slugs import transliterate
+
+from .models import Category, Product
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MIN_LENGTH = 2
+# (version, shard names) of the latest built index; each shard is stored
+# under its own key next to it
+INDEX_KEY = "autocomplete:index"
+VERSION_KEY = "autocomplete:version"
+LOCK_KEY = "autocomplete:lock"
+# Seconds a rebuild may hold the lock, and that a cold worker waits for one
+REBUILD_LOCK_TIMEOUT = 60
+REBUILD_WAIT = 2
+
+_memo = {"version": None, "shards": {}}
+
+
+def normalize(text):
+    return " ".join(str(text).casefold().split())
+
+
+def _keys(label):
+    words = normalize(label).split(" ")
+    for start in range(len(words)):
+        suffix = " ".join(words[start:])
+        yield suffix
+        latin = transliterate(suffix)
+        if latin != suffix:
+            yield latin
+
+
+def build_index():
+    sources = [
+        ("category", Category.objects.exclude(slug="").values_list("name", "slug")),
+        (
+            "store",
+            SellerProfile.objects.filter(is_active=True)
+            .exclude(store_slug="")
+            .values_list("store_name", "store_slug"),
+        ),
+        (
+            "product",
+            Product.objects.filter(is_active=True)
+            .exclude(slug="")
+            .values_list("name", "slug"),
+        ),
+    ]
+    entries = {
+        (key, kind, label, slug)
+        for kind, rows in sources
+        for label, slug in rows.iterator()
+        for key in _keys(label)
+    }
+    return sorted(entries)
+
+
+def shard_for(key):
+    return key[:AUTOCOMPLETE_MIN_LENGTH]
+
+
+def split_index(index):
+    """Group index entries by shard, dropping keys too short to be looked up"""
+    shards = defaultdict(list)
+    for entry in index:
+        if len(entry[0]) >= AUTOCOMPLETE_MIN_LENGTH:
+            shards[shard_for(entry[0])].append(entry)
+    return dict(shards)
+
+
+def _shard_key(version, shard):
+    # Shard names are Cyrillic or contain spaces, which memcached keys cannot
+    return f"{INDEX_KEY}:{version}:{shard.encode().hex()}"
+
+
+def invalidate_index():
+    # The stored shards stay in place so they can be served until rebuilt.
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _rebuild(version):
+    try:
+        shards = split_index(build_index())
+        previous = cache.get(INDEX_KEY)
+        cache.set_many(
+            {_shard_key(version, shard): entries for shard, entries in shards.items()},
+            None,
+        )
+        cache.set(INDEX_KEY, (version, frozenset(shards)), None)
+        if previous is not None and previous[0] != version:
+            cache.delete_many([_shard_key(previous[0], name) for name in previous[1]])
+    finally:
+        cache.delete(LOCK_KEY)
+    return shards
+
+
+def _load_shard(built, shard):
+    """A shard of a built index, or None if the cache has lost it"""
+    version, names = built
+    if shard not in names:
+        return []
+    return cache.get(_shard_key(version, shard))
+
+
+def get_shard(shard):
+    """The sorted index entries whose key starts with ``shard``"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY)
+    if _memo["version"] != version:
+        _memo.update(version=version, shards={})
+    if shard in _memo["shards"]:
+        return _memo["shards"][shard]
+
+    built = cache.get(INDEX_KEY)
+    if built is not None and built[0] == version:
+        entries = _load_shard(built, shard)
+        if entries is None:
+            # Evicted: rebuild on a later request and answer from the database
+            invalidate_index()
+            return split_index(build_index()).get(shard, [])
+    elif cache.add(LOCK_KEY, 1, REBUILD_LOCK_TIMEOUT):
+        _memo["shards"] = _rebuild(version)
+        entries = _memo["shards"].setdefault(shard, [])
+    else:
+        # Another worker is rebuilding: serve the stale shard if there is one
+        stale = _load_shard(built, shard) if built is not None else None
+        if stale is not None:
+            return stale
+        deadline = time.monotonic() + REBUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            built = cache.get(INDEX_KEY)
+            if built is not None and built[0] == version:
+                stored = _load_shard(built, shard)
+                if stored is not None:
+                    return stored
+        return split_index(build_index()).get(shard, [])
+
+    _memo["shards"][shard] = entries
+    return entries
+
+
+def suggest(query, limit=AUTOCOMPLETE_LIMIT):
+    """Up to ``limit`` distinct suggestions whose name has a word starting with ``query``"""
+    prefix = normalize(query)
+    if len(prefix) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+
+    index = get_shard(shard_for(prefix))
+    results, seen = [], set()
+    position = bisect_left(index, (prefix,))
+    while position < len(index) and len(results) < limit:
+        key, kind, label, slug = index[position]
+        if not key.startswith(prefix):
+            break
+        if (kind, slug) not in seen:
+            seen.add((kind, slug))
+            results.append({"kind": kind, "label": label, "slug": slug})
+        position += 1
+    return results
+
+
+def suggestion_url(suggestion):
+    if suggestion["kind"] == "product":
+        return reverse("products:detail", args=[suggestion["slug"]])
+    if suggestion["kind"] == "store":
+        return reverse("accounts:seller_store_view", args=[suggestion["slug"]])
+    return f"{reverse('products:list')}?category={suggestion['slug']}"
@@ -1,6 +1,7 @@
 from django import forms
+from django.utils import timezone
 
-from .models import Product, Review
+from .models import PriceRule, Product, Review, ScheduledChange
 
 
 class ProductForm(forms.ModelForm):
@@ -59,3 +60,120 @@ class ReviewForm(forms.ModelForm):
                     "Ви не можете залишати відгуки на свої товари"
                 )
         return cleaned_data
+
+
+class InventoryUploadForm(forms.Form):
+    csv_file = forms.FileField(
+        required=False,
+        label="CSV файл",
+        widget=forms.FileInput(attrs={"class": "form-control", "accept": ".csv"}),
+    )
+    rows = forms.CharField(
+        required=False,
+        label="Або вставте рядки з таблиці",
+        widget=forms.Textarea(
+            attrs={
+                "class": "form-control",
+                "rows": 10,
+                "placeholder": "slug;price;stock;is_active",
+            }
+        ),
+    )
+    preview = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Лише попередній перегляд",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        csv_file = cleaned_data.get("csv_file")
+        if csv_file:
+            try:
+                cleaned_data["text"] = csv_file.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise forms.ValidationError("Файл повинен бути у кодуванні UTF-8")
+        else:
+            cleaned_data["text"] = cleaned_data.get("rows", "")
+        if not cleaned_data["text"].strip():
+            raise forms.ValidationError("Завантажте файл або вставте рядки")
+        return cleaned_data
+
+
+class PriceRuleForm(forms.ModelForm):
+    class Meta:
+        model = PriceRule
+        fields = ["name", "category", "action", "value", "rounding"]
+        labels = {
+            "name": "Назва",
+            "category": "Категорія",
+            "action": "Дія",
+            "value": "Значення",
+            "rounding": "Округлення",
+        }
+        widgets = {
+            "name": forms.TextInput(
+                attrs={"class": "form-control", "placeholder": "-15% на спорт"}
+            ),
+            "category": forms.Select(attrs={"class": "form-control"}),
+            "action": forms.Select(attrs={"class": "form-control"}),
+            "value": forms.NumberInput(attrs={"class": "form-control", "step": "0.01"}),
+            "rounding": forms.Select(attrs={"class": "form-control"}),
+        }
+
+
+class PriceRuleApplyForm(forms.Form):
+    rules = forms.ModelMultipleChoiceField(
+        queryset=PriceRule.objects.none(),
+        label="Правила (застосовуються по черзі)",
+        widget=forms.CheckboxSelectMultiple,
+    )
+    preview = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Лише попередній перегляд",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def __init__(self, *args, seller=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["rules"].queryset = PriceRule.objects.filter(
+            seller=seller
+        ).select_related("category")
+
+
+class ScheduledChangeForm(forms.ModelForm):
+    ends_at = forms.DateTimeField(
+        required=False,
+        label="Повернути поточну ціну",
+        help_text="Для розпродажу: коли відновити поточну ціну",
+        widget=forms.DateTimeInput(
+            attrs={"class": "form-control", "type": "datetime-local"}
+        ),
+    )
+
+    class Meta:
+        model = ScheduledChange
+        fields = ["action", "due_at", "price"]
+        labels = {"action": "Дія", "due_at": "Коли", "price": "Нова ціна"}
+        widgets = {
+            "action": forms.Select(attrs={"class": "form-control"}),
+            "due_at": forms.DateTimeInput(
+                attrs={"class": "form-control", "type": "datetime-local"}
+            ),
+            "price": forms.NumberInput(attrs={"class": "form-control", "step": "0.01"}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        due_at = cleaned_data.get("due_at")
+        ends_at = cleaned_data.get("ends_at")
+        if due_at and due_at <= timezone.now():
+            self.add_error("due_at", "Час має бути в майбутньому")
+        if ends_at:
+            if cleaned_data.get("action") != "price":
+                self.add_error("ends_at", "Лише для зміни ціни")
+            elif due_at and ends_at <= due_at:
+                self.add_error("ends_at", "Має бути пізніше за початок")
+        return cleaned_data
@@ -0,0 +1,177 @@
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Product
+from .signals import products_bulk_changed
+
+INVENTORY_COLUMNS = ["slug", "price", "stock", "is_active"]
+INVENTORY_CHUNK_SIZE = 500
+
+TRUE_VALUES = {"1", "true", "yes", "y", "так", "+"}
+FALSE_VALUES = {"0", "false", "no", "n", "ні", "-"}
+
+PRICE_FIELD = Product._meta.get_field("price")
+MAX_PRICE = Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)
+
+
+def _delimiter(text):
+    """
+    Delimiter of the first non-empty line. Tab and ";" win over ",", since
+    Excel in Ukrainian locales separates with ";" and writes decimal commas.
+    """
+    first = next((line for line in text.splitlines() if line.strip()), "")
+    for delimiter in ("\t", ";"):
+        if delimiter in first:
+            return delimiter
+    return ","
+
+
+def parse_inventory_rows(text):
+    """Parse CSV or tab-separated text into a list of (line, dict) rows"""
+    text = text.lstrip("\ufeff")
+    reader = csv.reader(io.StringIO(text), delimiter=_delimiter(text))
+
+    rows = []
+    for line, cells in enumerate(reader, start=1):
+        cells = [cell.strip() for cell in cells]
+        if not any(cells):
+            continue
+        if line == 1 and cells[0].lower() == "slug":
+            continue
+        cells += [""] * (len(INVENTORY_COLUMNS) - len(cells))
+        rows.append((line, dict(zip(INVENTORY_COLUMNS, cells))))
+    return rows
+
+
+def _clean_row(values):
+    cleaned = {}
+    errors = []
+
+    if values["price"]:
+        try:
+            price = Decimal(values["price"].replace(",", ".")).quantize(Decimal("0.01"))
+        except InvalidOperation:
+            errors.append("Некоректна ціна")
+        else:
+            if not price.is_finite() or price < 0 or price >= MAX_PRICE:
+                errors.append("Ціна поза допустимим діапазоном")
+            else:
+                cleaned["price"] = price
+
+    if values["stock"]:
+        try:
+            stock = int(values["stock"])
+        except ValueError:
+            errors.append("Некоректна кількість")
+        else:
+            if stock < 0:
+                errors.append("Кількість не може бути від'ємною")
+            else:
+                cleaned["stock"] = stock
+
+    if values["is_active"]:
+        flag = values["is_active"].lower()
+        if flag in TRUE_VALUES:
+            cleaned["is_active"] = True
+        elif flag in FALSE_VALUES:
+            cleaned["is_active"] = False
+        else:
+            errors.append("Некоректне значення активності")
+
+    return cleaned, errors
+
+
+def build_inventory_report(seller, rows):
+    """
+    Validate rows against the seller's products without touching the database
+    beyond one lookup per chunk. Returns the report and a list of
+    (product, changed_fields) pairs.
+    """
+    report = []
+    changed = []
+    seen = set()
+
+    for start in range(0, len(rows), INVENTORY_CHUNK_SIZE):
+        chunk = rows[start : start + INVENTORY_CHUNK_SIZE]
+        products = Product.objects.filter(
+            seller=seller, slug__in=[values["slug"] for _, values in chunk]
+        ).only("id", "slug", "price", "stock", "is_active", "category_id")
+        by_slug = {product.slug: product for product in products}
+
+        for line, values in chunk:
+            entry = {"line": line, "slug": values["slug"], "changes": {}, "errors": []}
+            report.append(entry)
+
+            product = by_slug.get(values["slug"])
+            if not values["slug"] or product is None:
+                entry["errors"].append("Товар не знайдено")
+                continue
+            if values["slug"] in seen:
+                entry["errors"].append("Товар повторюється у файлі")
+                continue
+            seen.add(values["slug"])
+
+            cleaned, errors = _clean_row(values)
+            if errors:
+                entry["errors"] = errors
+                continue
+
+            for field, value in cleaned.items():
+                if getattr(product, field) != value:
+                    entry["changes"][field] = (getattr(product, field), value)
+                    setattr(product, field, value)
+            if entry["changes"]:
+                changed.append((product, list(entry["changes"])))
+
+    return report, changed
+
+
+def apply_inventory_changes(seller, changed):
+    """
+    Write (product, fields) pairs in one transaction, with one bulk_update per
+    set of changed fields and chunk. Only the changed fields are written, so a
+    price-only row does not overwrite stock that a checkout took meanwhile.
+    """
+    if not changed:
+        return 0
+
+    now = timezone.now()
+    by_fields = defaultdict(list)
+    for product, fields in changed:
+        product.updated_at = now
+        by_fields[tuple(sorted(fields))].append(product)
+
+    with transaction.atomic():
+        for fields, group in by_fields.items():
+            for start in range(0, len(group), INVENTORY_CHUNK_SIZE):
+                Product.objects.bulk_update(
+                    group[start : start + INVENTORY_CHUNK_SIZE],
+                    [*fields, "updated_at"],
+                )
+
+    products = [product for product, _ in changed]
+    products_bulk_changed(
+        [product.id for product in products],
+        [seller.id],
+        [product.category_id for product in products],
+        reindex=True,
+    )
+    return len(products)
+
+
+def export_inventory_csv(seller, response):
+    writer = csv.writer(response)
+    writer.writerow(INVENTORY_COLUMNS)
+    for slug, price, stock, is_active in (
+        Product.objects.filter(seller=seller)
+        .order_by("slug")
+        .values_list(*INVENTORY_COLUMNS)
+        .iterator()
+    ):
+        writer.writerow([slug, price, stock, int(is_active)])
+    return response
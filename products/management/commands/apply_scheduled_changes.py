@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.scheduling import apply_scheduled_changes
+
+
+class Command(BaseCommand):
+    help = "Apply scheduled product activations, deactivations and price changes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of due changes applied per transaction",
+        )
+
+    def handle(self, *args, **options):
+        applied = apply_scheduled_changes(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} scheduled changes"))
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.models import SellerProfile
+from products.models import Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure render time and HTML size of the main pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="Number of timed requests per page",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        anonymous = Client()
+        pages = [
+            ("home", anonymous, reverse("home")),
+            ("product_list", anonymous, reverse("products:list")),
+        ]
+
+        product = Product.objects.filter(is_active=True).exclude(slug="").first()
+        if product:
+            pages.append(
+                (
+                    "product_detail",
+                    anonymous,
+                    reverse("products:detail", args=[product.slug]),
+                )
+            )
+
+        store = (
+            SellerProfile.objects.filter(is_active=True).exclude(store_slug="").first()
+        )
+        if store:
+            pages.append(
+                (
+                    "seller_store_view",
+                    anonymous,
+                    reverse("accounts:seller_store_view", args=[store.store_slug]),
+                )
+            )
+
+        buyer = User.objects.filter(is_seller=False, is_active=True).first()
+        if buyer:
+            client = Client()
+            client.force_login(buyer)
+            pages += [
+                ("cart", client, reverse("orders:cart")),
+                ("order_history", client, reverse("orders:order_history")),
+            ]
+
+        self.stdout.write(
+            f"{'page':<20}{'status':>8}{'bytes':>10}{'mean ms':>10}{'p95 ms':>10}{'cache':>8}"
+        )
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for name, client, url in pages:
+                response = client.get(url)
+                timings = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f"{name:<20}{response.status_code:>8}{len(response.content):>10}"
+                    f"{statistics.mean(timings):>10.2f}{p95:>10.2f}"
+                    f"{response.get('X-Page-Cache', '-'):>8}"
+                )
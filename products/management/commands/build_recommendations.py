@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from products.recommendations import update_recommendations
+
+
+class Command(BaseCommand):
+    help = "Update 'customers also bought' recommendations from paid orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild from all paid orders instead of those since the last run",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of products re-ranked per query batch",
+        )
+
+    def handle(self, *args, **options):
+        orders, products = update_recommendations(
+            full=options["full"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {orders} orders, updated recommendations for {products} products"
+            )
+        )
@@ -1,7 +1,11 @@
+from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
 
 from products.models import Review
 
+User = get_user_model()
+
 
 class Command(BaseCommand):
     help = "Clean up orphaned reviews that don't have associated users"
@@ -42,8 +46,8 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"Successfully deleted {count} orphaned reviews")
             )
 
-        invalid_user_reviews = Review.objects.filter(user__isnull=False).exclude(
-            user__in=Review.objects.values_list("user", flat=True).distinct()
+        invalid_user_reviews = Review.objects.filter(
+            ~Exists(User.objects.filter(id=OuterRef("user_id")))
         )
         invalid_count = invalid_user_reviews.count()
 
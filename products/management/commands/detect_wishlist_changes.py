@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from products.wishlist import WISHLIST_CHUNK_SIZE, detect_wishlist_changes
+
+
+class Command(BaseCommand):
+    help = "Alert users about price drops and restocks of products in their wishlists"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Check every wishlist instead of products changed since the last run",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=WISHLIST_CHUNK_SIZE,
+            help="Number of wishlist rows processed per query batch",
+        )
+
+    def handle(self, *args, **options):
+        created = detect_wishlist_changes(
+            full=options["full"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} wishlist alerts"))
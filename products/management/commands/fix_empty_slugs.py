@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
-from django.utils.text import slugify
 
+from marketplace.slugs import slugify
 from products.models import Product
 
 
@@ -0,0 +1,306 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.db.models import (
+    Count,
+    DecimalField,
+    Exists,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import SellerProfile
+from marketplace.page_cache import CATALOG_TAG, invalidate_tags, product_tag, seller_tag
+from marketplace.slugs import slugify
+from orders.models import Order, OrderItem, SellerOrder, StockReservation
+from products.models import Category, CategoryPriceStats, Product, Review
+from products.price_stats import refresh_price_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Detect and repair data integrity problems using set-based queries"
+
+    checks = [
+        "orphaned_reviews",
+        "empty_slugs",
+        "invalid_cart_lines",
+        "duplicate_pending_orders",
+        "stale_reservations",
+        "stale_counters",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows each check would repair",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows repaired per transaction",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=self.checks,
+            help="Run only the given checks",
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.chunk_size = options["chunk_size"]
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN: nothing will be changed"))
+
+        total = 0
+        for check in options["only"] or self.checks:
+            count = getattr(self, f"check_{check}")()
+            total += count
+            style = self.style.WARNING if count else self.style.SUCCESS
+            verb = "found" if self.dry_run else "repaired"
+            self.stdout.write(style(f"{check}: {count} {verb}"))
+
+        if total and not self.dry_run:
+            # Repairs use bulk queries that skip model signals.
+            invalidate_tags(CATALOG_TAG)
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} problems in total"))
+
+    def delete_in_chunks(self, queryset, tags=None):
+        """
+        Count or delete matching rows, one chunk of ids per transaction. Models
+        with post_delete receivers cannot be fast-deleted, so for them pass
+        ``tags``, a callable returning the page cache tags of a chunk: rows are
+        then removed with a raw DELETE and the tags are bumped once per chunk.
+        Only models that nothing else references may be deleted that way.
+        """
+        if self.dry_run:
+            return queryset.count()
+
+        model = queryset.model
+        using = router.db_for_write(model)
+        deleted = 0
+        while True:
+            with transaction.atomic(using=using):
+                ids = list(queryset.values_list("id", flat=True)[: self.chunk_size])
+                if not ids:
+                    return deleted
+                rows = model.objects.filter(id__in=ids)
+                if tags is None:
+                    rows.delete()
+                else:
+                    stale = tags(rows)
+                    rows._raw_delete(using)
+                    transaction.on_commit(lambda: invalidate_tags(*stale), using)
+                deleted += len(ids)
+
+    def review_tags(self, reviews):
+        product_ids = set(reviews.values_list("product_id", flat=True))
+        seller_ids = set(
+            Product.objects.filter(id__in=product_ids).values_list(
+                "seller_id", flat=True
+            )
+        )
+        return [
+            *[product_tag(product_id) for product_id in product_ids],
+            *[seller_tag(seller_id) for seller_id in seller_ids],
+        ]
+
+    def check_orphaned_reviews(self):
+        return self.delete_in_chunks(
+            Review.objects.filter(
+                ~Exists(User.objects.filter(id=OuterRef("user_id")))
+                | ~Exists(Product.objects.filter(id=OuterRef("product_id")))
+            ),
+            tags=self.review_tags,
+        )
+
+    def check_empty_slugs(self):
+        return sum(
+            self.fill_empty_slugs(model, field, source, fallback)
+            for model, field, source, fallback in [
+                (Product, "slug", "name", "product"),
+                (Category, "slug", "name", "category"),
+                (SellerProfile, "store_slug", "store_name", "store"),
+            ]
+        )
+
+    def fill_empty_slugs(self, model, field, source, fallback):
+        empty = model.objects.filter(**{field: ""})
+        if self.dry_run:
+            return empty.count()
+
+        fixed = 0
+        while True:
+            with transaction.atomic():
+                rows = list(empty.only("id", field, source)[: self.chunk_size])
+                if not rows:
+                    return fixed
+
+                bases = {
+                    row.id: slugify(getattr(row, source)) or fallback for row in rows
+                }
+                candidates = set(bases.values()) | {
+                    f"{base}-{row_id}" for row_id, base in bases.items()
+                }
+                taken = set(
+                    model.objects.filter(**{f"{field}__in": candidates}).values_list(
+                        field, flat=True
+                    )
+                )
+
+                for row in rows:
+                    slug = self.free_slug(model, field, bases[row.id], row.id, taken)
+                    taken.add(slug)
+                    setattr(row, field, slug)
+
+                model.objects.bulk_update(rows, [field])
+                fixed += len(rows)
+
+    def free_slug(self, model, field, base, row_id, taken):
+        """First of ``base``, ``base-<id>`` and ``base-<id>-<n>`` not in use"""
+        for slug in (base, f"{base}-{row_id}"):
+            if slug not in taken:
+                return slug
+        counter = 1
+        while True:
+            slug = f"{base}-{row_id}-{counter}"
+            if slug not in taken and not model.objects.filter(**{field: slug}).exists():
+                return slug
+            counter += 1
+
+    def check_invalid_cart_lines(self):
+        return self.delete_in_chunks(
+            OrderItem.objects.filter(order__status="pending", quantity__lte=0)
+        )
+
+    def check_duplicate_pending_orders(self):
+        duplicates = (
+            Order.objects.filter(status="pending")
+            .values("customer")
+            .annotate(orders=Count("id"), keep_id=Min("id"))
+            .filter(orders__gt=1)
+            .order_by()
+        )
+        if self.dry_run:
+            return sum(row["orders"] - 1 for row in duplicates)
+
+        merged = 0
+        while True:
+            keep_ids = {
+                row["customer"]: row["keep_id"] for row in duplicates[: self.chunk_size]
+            }
+            if not keep_ids:
+                return merged
+
+            with transaction.atomic():
+                extra_orders = Order.objects.filter(
+                    status="pending", customer__in=keep_ids
+                ).exclude(id__in=keep_ids.values())
+                extra_items = OrderItem.objects.filter(order__in=extra_orders)
+
+                kept_items = {
+                    (item.order_id, item.product_id): item
+                    for item in OrderItem.objects.filter(order_id__in=keep_ids.values())
+                }
+                moved, collided = [], {}
+                for item in extra_items.select_related("order"):
+                    keep_id = keep_ids[item.order.customer_id]
+                    kept = kept_items.get((keep_id, item.product_id))
+                    if kept is None:
+                        item.order_id = keep_id
+                        kept_items[(keep_id, item.product_id)] = item
+                        moved.append(item)
+                    else:
+                        kept.quantity += item.quantity
+                        collided[kept.id] = kept
+
+                OrderItem.objects.bulk_update(moved, ["order"])
+                OrderItem.objects.bulk_update(collided.values(), ["quantity"])
+                merged += extra_orders.count()
+                extra_orders.delete()
+
+    def check_stale_reservations(self):
+        return self.delete_in_chunks(
+            StockReservation.objects.filter(
+                Q(expires_at__lte=timezone.now())
+                | ~Q(order_item__order__status="pending")
+                | ~Q(quantity=F("order_item__quantity"))
+            )
+        )
+
+    def check_stale_counters(self):
+        return self.fix_seller_order_totals() + self.fix_price_stats()
+
+    def fix_seller_order_totals(self):
+        """Sub-order line counts and subtotals that no longer match their lines"""
+        amount = DecimalField(max_digits=12, decimal_places=2)
+        lines = (
+            OrderItem.objects.filter(seller_order_id=OuterRef("id"))
+            .values("seller_order_id")
+            .order_by()
+        )
+        actual_count = Coalesce(
+            Subquery(lines.annotate(count=Count("id")).values("count")), Value(0)
+        )
+        actual_subtotal = Coalesce(
+            Subquery(
+                lines.annotate(
+                    subtotal=Sum(F("quantity") * F("unit_price"), output_field=amount)
+                ).values("subtotal")
+            ),
+            Value(0),
+            output_field=amount,
+        )
+        stale = SellerOrder.objects.alias(
+            actual_count=actual_count, actual_subtotal=actual_subtotal
+        ).filter(~Q(items_count=F("actual_count")) | ~Q(subtotal=F("actual_subtotal")))
+        if self.dry_run:
+            return stale.count()
+
+        fixed = 0
+        while True:
+            with transaction.atomic():
+                ids = list(stale.values_list("id", flat=True)[: self.chunk_size])
+                if not ids:
+                    return fixed
+                SellerOrder.objects.filter(id__in=ids).update(
+                    items_count=actual_count, subtotal=actual_subtotal
+                )
+                fixed += len(ids)
+
+    def fix_price_stats(self):
+        """
+        Category price stats whose count or range differs from the active
+        products. There is one row per category, so each is recomputed whole.
+        """
+        actual = {
+            row["category_id"]: (row["count"], row["low"], row["high"])
+            for row in Product.objects.filter(is_active=True, category__isnull=False)
+            .values("category_id")
+            .annotate(count=Count("id"), low=Min("price"), high=Max("price"))
+            .order_by()
+        }
+        stale = [
+            category_id
+            for category_id, *stored in CategoryPriceStats.objects.filter(
+                category__isnull=False
+            ).values_list("category_id", "product_count", "min_price", "max_price")
+            if tuple(stored) != actual.get(category_id, (0, None, None))
+        ]
+        if not self.dry_run:
+            for category_id in stale:
+                refresh_price_stats(category_id)
+        return len(stale)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.page_cache import CATALOG_TAG, invalidate_tags
+from products.price_stats import refresh_all_price_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-category price ranges and buckets for the catalog filters"
+
+    def handle(self, *args, **options):
+        rows = refresh_all_price_stats()
+        invalidate_tags(CATALOG_TAG)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {rows} price stats rows"))
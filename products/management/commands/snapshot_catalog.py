@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from products.snapshot import CHUNK_SIZE, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Export products, order lines and reviews to memory-mappable column files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default="snapshots/catalog",
+            help="Directory to write the snapshot to (replaced when complete)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Number of rows fetched and written per batch",
+        )
+
+    def handle(self, *args, **options):
+        rows = write_snapshot(options["path"], chunk_size=options["chunk_size"])
+        summary = ", ".join(f"{count} {table}" for table, count in rows.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote snapshot to {options['path']}: {summary}")
+        )
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_price_rules"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("activate", "Опублікувати"),
+                            ("deactivate", "Зняти з продажу"),
+                            ("price", "Змінити ціну"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("due_at", models.DateTimeField()),
+                ("applied_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_changes",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запланована зміна",
+                "verbose_name_plural": "Заплановані зміни",
+                "ordering": ["due_at", "id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("applied_at__isnull", True)),
+                        fields=["due_at"],
+                        name="scheduled_change_pending_idx",
+                    )
+                ],
+            },
+        ),
+    ]
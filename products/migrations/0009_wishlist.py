@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_scheduled_changes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WishlistAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("price_drop", "Ціна знизилась"),
+                            ("restock", "Знову в наявності"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("old_price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("new_price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("read_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Сповіщення про обране",
+                "verbose_name_plural": "Сповіщення про обране",
+                "ordering": ["-created_at", "-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="WishlistItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("in_stock", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Обраний товар",
+                "verbose_name_plural": "Обрані товари",
+                "ordering": ["-created_at", "-id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["updated_at"], name="products_pr_updated_150263_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="wishlistalert",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="products.product",
+            ),
+        ),
+        migrations.AddField(
+            model_name="wishlistalert",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="wishlist_alerts",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="wishlistitem",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="wishlisted_by",
+                to="products.product",
+            ),
+        ),
+        migrations.AddField(
+            model_name="wishlistitem",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="wishlist_items",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="wishlistalert",
+            index=models.Index(
+                fields=["user", "read_at"], name="products_wi_user_id_5f1aad_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="wishlistitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "product"), name="unique_wishlist_item"
+            ),
+        ),
+    ]
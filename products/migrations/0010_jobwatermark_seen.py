@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_wishlist"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobwatermark",
+            name="seen",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:19
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_jobwatermark_seen"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scheduledchange",
+            name="price",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                validators=[django.core.validators.MinValueValidator(0)],
+            ),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.utils.text import slugify
+
+from marketplace.slugs import slugify
 
 User = get_user_model()
 
@@ -47,6 +49,10 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товари"
+        indexes = [
+            models.Index(fields=["category", "is_active", "price"]),
+            models.Index(fields=["updated_at"]),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug and self.name:
@@ -69,10 +75,10 @@ class Product(models.Model):
     @property
     def average_rating(self):
         """Calculate average rating for the product"""
-        reviews = self.reviews.filter(user__isnull=False)
-        if not reviews:
-            return 0
-        return sum(review.rating for review in reviews) / len(reviews)
+        average = self.reviews.filter(user__isnull=False).aggregate(
+            average=models.Avg("rating")
+        )["average"]
+        return average or 0
 
     @property
     def review_count(self):
@@ -98,6 +104,7 @@ class Review(models.Model):
         verbose_name_plural = "Відгуки"
         unique_together = ["product", "user"]
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["product", "-created_at", "-id"])]
 
     def __str__(self):
         try:
@@ -128,3 +135,265 @@ class Review(models.Model):
                 raise ValidationError("Sellers cannot review their own products")
         except Exception:
             pass
+
+
+class CategoryPriceStats(models.Model):
+    """
+    Price range and quantile buckets of active products in a category,
+    or in the whole catalog when ``category`` is empty
+    """
+
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="price_stats",
+        null=True,
+        blank=True,
+    )
+    product_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    buckets = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Статистика цін категорії"
+        verbose_name_plural = "Статистика цін категорій"
+
+    def __str__(self):
+        return f"{self.category or 'Усі категорії'}: {self.min_price}–{self.max_price}"
+
+
+class ProductRecommendation(models.Model):
+    """
+    One cell of the item-item co-purchase matrix: how many paid orders
+    contained both products. ``rank`` is set for the top neighbours only.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="co_purchases"
+    )
+    recommended = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommended_for"
+    )
+    orders = models.PositiveIntegerField(default=0)
+    rank = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Рекомендація"
+        verbose_name_plural = "Рекомендації"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "recommended"], name="unique_recommendation"
+            )
+        ]
+        indexes = [models.Index(fields=["product", "rank"])]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.recommended_id} ({self.orders})"
+
+
+class JobWatermark(models.Model):
+    """Point up to which an incremental background job has processed data"""
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    # Ids already processed within the overlap the next run reads again
+    seen = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name = "Позначка фонової задачі"
+        verbose_name_plural = "Позначки фонових задач"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class PriceRule(models.Model):
+    """A saved re-pricing step a seller can apply to many products at once"""
+
+    ACTIONS = (
+        ("percent", "Змінити на відсоток"),
+        ("amount", "Змінити на суму"),
+        ("set", "Встановити ціну"),
+    )
+    ROUNDING = (
+        ("", "Без округлення"),
+        ("whole", "До цілого"),
+        ("99", "Закінчувати на .99"),
+    )
+
+    seller = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="price_rules"
+    )
+    name = models.CharField(max_length=100)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Порожньо — усі товари продавця",
+    )
+    action = models.CharField(max_length=10, choices=ACTIONS, default="percent")
+    value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Відсоток (-15 — знижка 15%), сума або нова ціна",
+    )
+    rounding = models.CharField(max_length=5, choices=ROUNDING, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Цінове правило"
+        verbose_name_plural = "Цінові правила"
+        ordering = ["created_at", "id"]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.action == "percent" and self.value <= -100:
+            raise ValidationError({"value": "Знижка має бути меншою за 100%"})
+        if self.action == "set" and self.value < 0:
+            raise ValidationError({"value": "Ціна не може бути від'ємною"})
+
+
+class PriceChangeBatch(models.Model):
+    """Audit record of one application of price rules, used for rollback"""
+
+    seller = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="price_change_batches"
+    )
+    rules = models.JSONField(default=list, help_text="Застосовані правила")
+    products_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    rolled_back_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Зміна цін"
+        verbose_name_plural = "Зміни цін"
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"{self.seller} {self.created_at:%Y-%m-%d %H:%M}: {self.products_count}"
+
+
+class PriceChange(models.Model):
+    batch = models.ForeignKey(
+        PriceChangeBatch, on_delete=models.CASCADE, related_name="changes"
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Зміна ціни товару"
+        verbose_name_plural = "Зміни цін товарів"
+
+    def __str__(self):
+        return f"{self.product_id}: {self.old_price} → {self.new_price}"
+
+
+class ScheduledChange(models.Model):
+    """A product change that ``apply_scheduled_changes`` makes once it is due"""
+
+    ACTIONS = (
+        ("activate", "Опублікувати"),
+        ("deactivate", "Зняти з продажу"),
+        ("price", "Змінити ціну"),
+    )
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="scheduled_changes"
+    )
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+    )
+    due_at = models.DateTimeField()
+    applied_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Запланована зміна"
+        verbose_name_plural = "Заплановані зміни"
+        ordering = ["due_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["due_at"],
+                condition=models.Q(applied_at__isnull=True),
+                name="scheduled_change_pending_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.get_action_display()} {self.due_at}"
+
+    def clean(self):
+        if self.action == "price" and self.price is None:
+            raise ValidationError({"price": "Вкажіть нову ціну"})
+
+
+class WishlistItem(models.Model):
+    """
+    A product a user saved for later. ``price`` and ``in_stock`` are the
+    values last seen by ``detect_wishlist_changes``, to compare against.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="wishlist_items"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="wishlisted_by"
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    in_stock = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Обраний товар"
+        verbose_name_plural = "Обрані товари"
+        ordering = ["-created_at", "-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "product"], name="unique_wishlist_item"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} ♥ {self.product_id}"
+
+
+class WishlistAlert(models.Model):
+    KINDS = (
+        ("price_drop", "Ціна знизилась"),
+        ("restock", "Знову в наявності"),
+    )
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="wishlist_alerts"
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KINDS)
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Сповіщення про обране"
+        verbose_name_plural = "Сповіщення про обране"
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["user", "read_at"])]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.get_kind_display()} {self.product_id}"
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.db.models import Count, Max, Min, Q
+
+from .models import Category, CategoryPriceStats, Product
+
+PRICE_BUCKETS = 5
+PRICE_STEP = Decimal("0.01")
+
+
+def compute_price_stats(products):
+    """
+    Min, max, count and up to ``PRICE_BUCKETS`` quantile buckets of ``products``.
+    Quantile edges are read with indexed ORDER BY price OFFSET queries and the
+    bucket counts with one conditional aggregate, so no prices are loaded.
+    """
+    stats = products.aggregate(
+        min_price=Min("price"), max_price=Max("price"), product_count=Count("id")
+    )
+    count = stats["product_count"]
+    if not count:
+        return {**stats, "buckets": []}
+
+    prices = products.order_by("price").values_list("price", flat=True)
+    edges = sorted(
+        {stats["min_price"]}
+        | {prices[count * step // PRICE_BUCKETS] for step in range(1, PRICE_BUCKETS)}
+    )
+
+    # Prices have two decimals, so [low, high) is exactly [low, high - 0.01],
+    # which matches the inclusive min_price/max_price filters.
+    ranges = [(low, high - PRICE_STEP) for low, high in zip(edges, edges[1:])] + [
+        (edges[-1], stats["max_price"])
+    ]
+    counts = products.aggregate(
+        **{
+            f"bucket_{index}": Count("id", filter=Q(price__gte=low, price__lte=high))
+            for index, (low, high) in enumerate(ranges)
+        }
+    )
+    stats["buckets"] = [
+        {
+            "min": str(low.quantize(PRICE_STEP)),
+            "max": str(high.quantize(PRICE_STEP)),
+            "count": counts[f"bucket_{index}"],
+        }
+        for index, (low, high) in enumerate(ranges)
+    ]
+    return stats
+
+
+def refresh_price_stats(category_id=None):
+    """Recompute the stats row of one category, or of the catalog for ``None``"""
+    products = Product.objects.filter(is_active=True)
+    if category_id is not None:
+        if not Category.objects.filter(id=category_id).exists():
+            return None
+        products = products.filter(category_id=category_id)
+
+    stats, _ = CategoryPriceStats.objects.update_or_create(
+        category_id=category_id, defaults=compute_price_stats(products)
+    )
+    return stats
+
+
+def refresh_all_price_stats():
+    """Recompute the catalog row and every category row"""
+    refresh_price_stats(None)
+    category_ids = list(Category.objects.values_list("id", flat=True))
+    for category_id in category_ids:
+        refresh_price_stats(category_id)
+    return len(category_ids) + 1
+
+
+def price_stats_for(category_slug=None):
+    """Stored stats for the filtered category (or the catalog), one query"""
+    if category_slug:
+        lookup = {"category__slug__iexact": category_slug}
+    else:
+        lookup = {"category__isnull": True}
+    return CategoryPriceStats.objects.filter(**lookup).first()
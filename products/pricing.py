@@ -0,0 +1,203 @@
+"""
+Bulk re-pricing with seller-defined price rules.
+
+Prices are loaded as ``(id, category, cents)`` columns with one query and the
+rules run over the integer cents, so the arithmetic is exact and rounds half
+away from zero, like ``Decimal.quantize`` with ``ROUND_HALF_UP`` (not its
+default banker's rounding). Applying writes the new prices in chunked updates
+grouped by price and records every old/new pair in a ``PriceChangeBatch``
+that can be rolled back.
+"""
+
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import INVENTORY_CHUNK_SIZE, MAX_PRICE
+from .models import PriceChange, PriceChangeBatch, Product
+from .signals import products_bulk_changed
+
+PREVIEW_ROWS = 50
+MAX_CENTS = int(MAX_PRICE * 100)
+
+
+def to_cents(value):
+    return int((Decimal(str(value)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_price(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def _round_half_up(numerator, denominator):
+    if numerator < 0:
+        return -((-numerator * 2 + denominator) // (denominator * 2))
+    return (numerator * 2 + denominator) // (denominator * 2)
+
+
+def _rule_function(rule):
+    """Compile a rule into a function from cents to cents"""
+    value = to_cents(rule.value)
+    if rule.action == "percent":
+        # value is hundredths of a percent: -1500 is -15%
+        factor = 10000 + value
+
+        def change(cents):
+            return _round_half_up(cents * factor, 10000)
+
+    elif rule.action == "amount":
+
+        def change(cents):
+            return cents + value
+
+    else:
+
+        def change(cents):
+            return value
+
+    if rule.rounding == "whole":
+        return lambda cents: _round_half_up(change(cents), 100) * 100
+    if rule.rounding == "99":
+        return lambda cents: max(_round_half_up(change(cents), 100) * 100 - 1, 99)
+    return change
+
+
+def load_prices(seller, categories=None):
+    """Columns of the seller's product ids, category ids and prices in cents"""
+    products = Product.objects.filter(seller=seller).order_by("pk")
+    if categories is not None:
+        products = products.filter(category_id__in=categories)
+    ids, category_ids, cents = [], [], []
+    for pk, category_id, price in products.values_list(
+        "pk", "category_id", "price"
+    ).iterator(chunk_size=INVENTORY_CHUNK_SIZE):
+        ids.append(pk)
+        category_ids.append(category_id)
+        cents.append(to_cents(price))
+    return ids, category_ids, cents
+
+
+def evaluate_rules(seller, rules):
+    """
+    Run ``rules`` in order over the seller's products. Returns
+    ``(changes, invalid)``: lists of ``(product_id, old_cents, new_cents)`` for
+    prices that change, and for those that would leave the allowed range.
+    """
+    rules = list(rules)
+    if not rules:
+        return [], []
+    categories = {rule.category_id for rule in rules}
+    ids, category_ids, old = load_prices(
+        seller, None if None in categories else categories
+    )
+
+    new = old
+    for rule in rules:
+        change = _rule_function(rule)
+        if rule.category_id is None:
+            new = [change(cents) for cents in new]
+        else:
+            new = [
+                change(cents) if category_id == rule.category_id else cents
+                for cents, category_id in zip(new, category_ids)
+            ]
+
+    changes, invalid = [], []
+    for pk, before, after in zip(ids, old, new):
+        if after == before:
+            continue
+        if after < 0 or after >= MAX_CENTS:
+            invalid.append((pk, before, after))
+        else:
+            changes.append((pk, before, after))
+    return changes, invalid
+
+
+def describe_rules(rules):
+    return [
+        {
+            "name": rule.name,
+            "category": rule.category_id,
+            "action": rule.action,
+            "value": str(rule.value),
+            "rounding": rule.rounding,
+        }
+        for rule in rules
+    ]
+
+
+def _write_prices(seller, prices, category_ids):
+    """Bulk update ``{product_id: cents}`` and refresh what depends on prices"""
+    # Rules map many products to the same price, and one UPDATE per price
+    # and chunk of ids is much faster than bulk_update's CASE per row.
+    by_price = defaultdict(list)
+    for pk, cents in prices.items():
+        by_price[cents].append(pk)
+    now = timezone.now()
+    for cents, ids in by_price.items():
+        for start in range(0, len(ids), INVENTORY_CHUNK_SIZE):
+            Product.objects.filter(
+                pk__in=ids[start : start + INVENTORY_CHUNK_SIZE]
+            ).update(price=to_price(cents), updated_at=now)
+
+    # update() sends no post_save, so refresh what the receivers would have.
+    transaction.on_commit(
+        lambda: products_bulk_changed(list(prices), [seller.id], category_ids)
+    )
+
+
+def apply_price_rules(seller, rules, changes):
+    """Write evaluated ``changes`` and record them in a new batch"""
+    with transaction.atomic():
+        batch = PriceChangeBatch.objects.create(
+            seller=seller, rules=describe_rules(rules), products_count=len(changes)
+        )
+        PriceChange.objects.bulk_create(
+            (
+                PriceChange(
+                    batch=batch,
+                    product_id=pk,
+                    old_price=to_price(before),
+                    new_price=to_price(after),
+                )
+                for pk, before, after in changes
+            ),
+            batch_size=INVENTORY_CHUNK_SIZE,
+        )
+        if changes:
+            category_ids = set(
+                batch.changes.values_list("product__category_id", flat=True)
+            )
+            _write_prices(seller, {pk: after for pk, _, after in changes}, category_ids)
+    return batch
+
+
+def rollback_price_batch(batch):
+    """
+    Restore the old prices of a batch. Products whose price changed again
+    since are left alone. Returns ``(restored, skipped)``.
+    """
+    with transaction.atomic():
+        batch = PriceChangeBatch.objects.select_for_update().get(pk=batch.pk)
+        if batch.rolled_back_at:
+            return 0, 0
+        restore, category_ids, skipped = {}, set(), 0
+        for pk, old_price, new_price, price, category_id in batch.changes.values_list(
+            "product_id",
+            "old_price",
+            "new_price",
+            "product__price",
+            "product__category_id",
+        ).iterator(chunk_size=INVENTORY_CHUNK_SIZE):
+            if price == new_price:
+                restore[pk] = to_cents(old_price)
+                category_ids.add(category_id)
+            else:
+                skipped += 1
+        if restore:
+            _write_prices(batch.seller, restore, category_ids)
+        batch.rolled_back_at = timezone.now()
+        batch.save(update_fields=["rolled_back_at"])
+    return len(restore), skipped
@@ -0,0 +1,141 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import permutations
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from marketplace.page_cache import invalidate_tags, product_tag
+from orders.models import OrderItem
+
+from .models import JobWatermark, Product, ProductRecommendation
+
+WATERMARK = "recommendations"
+TOP_N = 10
+RECOMMENDATIONS_SHOWN = 4
+# Very large baskets add quadratically many pairs and say little about taste.
+MAX_BASKET_SIZE = 50
+# Checkout sets paid_at before its transaction commits, so an order can become
+# visible after a run has moved past its paid_at. Each run re-reads this much
+# before the watermark and skips the orders the previous run already counted.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def co_purchase_counts(since=None, until=None, skip=()):
+    """
+    Sparse co-occurrence counts {(product, other): orders} for paid orders
+    other than ``skip``, and the paid time of every order read
+    """
+    lines = OrderItem.objects.filter(order__status__in=["paid", "shipped"])
+    if since is None:
+        # Orders paid before paid_at was recorded only have created_at
+        lines = lines.annotate(paid=Coalesce("order__paid_at", "order__created_at"))
+    else:
+        # Incremental runs filter the indexed column itself
+        lines = lines.annotate(paid=F("order__paid_at")).filter(paid__gt=since)
+    if until is not None:
+        lines = lines.filter(paid__lte=until)
+
+    baskets, paid = defaultdict(set), {}
+    rows = lines.values_list("order_id", "product_id", "paid").order_by()
+    for order_id, product_id, paid_at in rows:
+        paid[order_id] = paid_at
+        if order_id not in skip:
+            baskets[order_id].add(product_id)
+
+    counts = Counter()
+    for basket in baskets.values():
+        if 1 < len(basket) <= MAX_BASKET_SIZE:
+            counts.update(permutations(sorted(basket), 2))
+    return counts, paid
+
+
+def _merge_counts(counts, chunk_size):
+    """
+    Add new counts to the stored matrix and re-rank the affected products,
+    loading ``chunk_size`` products' rows at a time
+    """
+    by_product = defaultdict(dict)
+    for (product_id, other_id), orders in counts.items():
+        by_product[product_id][other_id] = orders
+
+    product_ids = sorted(by_product)
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start : start + chunk_size]
+        stored = defaultdict(dict)
+        for row in ProductRecommendation.objects.filter(product_id__in=chunk):
+            stored[row.product_id][row.recommended_id] = row
+
+        created, updated = [], []
+        for product_id in chunk:
+            rows, new = stored[product_id], by_product[product_id]
+            for other_id, orders in new.items():
+                if other_id not in rows:
+                    rows[other_id] = ProductRecommendation(
+                        product_id=product_id, recommended_id=other_id
+                    )
+                    created.append(rows[other_id])
+                rows[other_id].orders += orders
+
+            ranked = sorted(
+                rows.values(), key=lambda row: (-row.orders, row.recommended_id)
+            )
+            for position, row in enumerate(ranked, start=1):
+                rank = position if position <= TOP_N else None
+                if row.pk and (row.rank != rank or row.recommended_id in new):
+                    updated.append(row)
+                row.rank = rank
+
+        ProductRecommendation.objects.bulk_create(created, batch_size=1000)
+        ProductRecommendation.objects.bulk_update(
+            updated, ["orders", "rank"], batch_size=1000
+        )
+
+    return product_ids
+
+
+def update_recommendations(full=False, chunk_size=500):
+    """
+    Fold orders paid since the stored watermark into the co-purchase matrix.
+    With ``full`` the matrix is rebuilt from all paid orders.
+    Returns the number of orders processed and of products re-ranked.
+    """
+    until = timezone.now()
+    watermark = JobWatermark.objects.filter(name=WATERMARK).first()
+    if full or watermark is None:
+        since, skip = None, set()
+    else:
+        since, skip = watermark.value - WATERMARK_OVERLAP, set(watermark.seen)
+
+    counts, paid = co_purchase_counts(since, until, skip)
+    seen = sorted(
+        order_id
+        for order_id, paid_at in paid.items()
+        if paid_at > until - WATERMARK_OVERLAP
+    )
+
+    with transaction.atomic():
+        if since is None:
+            ProductRecommendation.objects.all().delete()
+        product_ids = _merge_counts(counts, chunk_size)
+        JobWatermark.objects.update_or_create(
+            name=WATERMARK, defaults={"value": until, "seen": seen}
+        )
+
+    # Rows were written in bulk, so product page signals did not fire.
+    if product_ids:
+        invalidate_tags(*(product_tag(product_id) for product_id in product_ids))
+    return len(paid.keys() - skip), len(product_ids)
+
+
+def recommended_products(product, limit=RECOMMENDATIONS_SHOWN):
+    """Active top co-purchased products, in rank order, with one query"""
+    return list(
+        Product.objects.filter(
+            recommended_for__product=product,
+            recommended_for__rank__isnull=False,
+            is_active=True,
+        ).order_by("recommended_for__rank")[:limit]
+    )
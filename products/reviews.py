@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from django.db.models import Count, Q
+
+from .models import Review
+
+REVIEWS_PAGE_SIZE = 10
+
+
+def rating_summary(product):
+    """Review count, average and star histogram from one GROUP BY rating query"""
+    counts = dict(
+        Review.objects.filter(product=product, user__isnull=False)
+        .order_by()
+        .values_list("rating")
+        .annotate(count=Count("id"))
+    )
+    total = sum(counts.values())
+    average = (
+        sum(rating * count for rating, count in counts.items()) / total if total else 0
+    )
+    histogram = [
+        {
+            "rating": rating,
+            "count": counts.get(rating, 0),
+            "percent": round(counts.get(rating, 0) * 100 / total) if total else 0,
+        }
+        for rating in range(5, 0, -1)
+    ]
+    return {"review_count": total, "average_rating": average, "histogram": histogram}
+
+
+def encode_cursor(review):
+    return f"{review.created_at.isoformat()}~{review.id}"
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, review_id = cursor.rsplit("~", 1)
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def review_page(product, cursor=None, exclude_user=None):
+    """
+    One keyset page of reviews ordered by (-created_at, -id).
+    Returns the reviews and the cursor for the next page (or None).
+    """
+    reviews = (
+        Review.objects.filter(product=product, user__isnull=False)
+        .select_related("user")
+        .order_by("-created_at", "-id")
+    )
+    if exclude_user is not None:
+        reviews = reviews.exclude(user=exclude_user)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, review_id = position
+        reviews = reviews.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=review_id)
+        )
+
+    page = list(reviews[: REVIEWS_PAGE_SIZE + 1])
+    if len(page) > REVIEWS_PAGE_SIZE:
+        page = page[:REVIEWS_PAGE_SIZE]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -0,0 +1,78 @@
+"""
+Scheduled product changes.
+
+Sellers schedule activation, deactivation or a new price ahead of time; the
+``apply_scheduled_changes`` command writes the due ones in batches. Catalog
+queries keep filtering on ``is_active`` and ``price`` only, so no request
+has to evaluate date windows.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .autocomplete import invalidate_index
+from .models import Product, ScheduledChange
+from .signals import products_bulk_changed
+
+FIELDS = {"activate": "is_active", "deactivate": "is_active", "price": "price"}
+
+
+def _value(change):
+    if change.action == "price":
+        return change.price
+    return change.action == "activate"
+
+
+def _apply_batch(changes, now):
+    """Write one batch of due changes; the latest change per field wins"""
+    latest = {}
+    for change in changes:
+        latest[(change.product_id, FIELDS[change.action])] = change
+
+    updates = defaultdict(list)
+    for (product_id, field), change in latest.items():
+        updates[(field, _value(change))].append(product_id)
+
+    with transaction.atomic():
+        for (field, value), product_ids in updates.items():
+            Product.objects.filter(pk__in=product_ids).update(
+                **{field: value, "updated_at": now}
+            )
+        ScheduledChange.objects.filter(pk__in=[change.pk for change in changes]).update(
+            applied_at=now
+        )
+
+    product_ids = {change.product_id for change in changes}
+    products = list(
+        Product.objects.filter(pk__in=product_ids).values_list(
+            "seller_id", "category_id"
+        )
+    )
+    # update() sends no post_save, so refresh what the receivers would have.
+    products_bulk_changed(
+        product_ids,
+        [seller_id for seller_id, _ in products],
+        [category_id for _, category_id in products],
+    )
+
+
+def apply_scheduled_changes(batch_size=1000, now=None):
+    """Apply changes due by ``now`` in batches, returning how many were applied"""
+    now = now or timezone.now()
+    applied = 0
+    while True:
+        changes = list(
+            ScheduledChange.objects.filter(applied_at__isnull=True, due_at__lte=now)
+            .order_by("due_at", "id")
+            .only("id", "product_id", "action", "price")[:batch_size]
+        )
+        if not changes:
+            break
+        _apply_batch(changes, now)
+        applied += len(changes)
+    if applied:
+        # Activation changes which products autocomplete may suggest
+        invalidate_index()
+    return applied
@@ -0,0 +1,119 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from marketplace.page_cache import (
+    CATALOG_TAG,
+    category_tag,
+    invalidate_tags,
+    product_tag,
+    seller_tag,
+)
+
+from .autocomplete import invalidate_index
+from .models import Category, Product, Review
+from .price_stats import refresh_price_stats
+
+
+def products_bulk_changed(product_ids, seller_ids, category_ids, reindex=False):
+    """
+    Do what the Product receivers below do, once for many products written
+    with update() or bulk_update(), which send no signals. ``reindex`` also
+    marks the autocomplete index stale, for changes to names or ``is_active``.
+    """
+    category_ids = {category_id for category_id in category_ids if category_id}
+    invalidate_tags(
+        CATALOG_TAG,
+        *[seller_tag(seller_id) for seller_id in set(seller_ids)],
+        *[category_tag(category_id) for category_id in category_ids],
+        *[product_tag(product_id) for product_id in product_ids],
+    )
+    if reindex:
+        invalidate_index()
+    for category_id in category_ids:
+        transaction.on_commit(partial(refresh_price_stats, category_id))
+
+
+# Stored values the post_save receivers compare against, and those of them
+# the autocomplete index is built from
+TRACKED_FIELDS = {
+    Product: ["category_id", "name", "slug", "is_active"],
+    Category: ["name", "slug"],
+}
+INDEXED_FIELDS = {
+    Product: ["name", "slug", "is_active"],
+    Category: ["name", "slug"],
+}
+
+
+def _categories(instance):
+    """The product's category and, after a move, the one it was saved in"""
+    stored = getattr(instance, "_stored", None) or {}
+    return {instance.category_id, stored.get("category_id")} - {None}
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Category)
+def remember_stored_values(sender, instance, **kwargs):
+    instance._stored = (
+        sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS[sender]).first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_pages(sender, instance, **kwargs):
+    invalidate_tags(
+        CATALOG_TAG,
+        product_tag(instance.id),
+        seller_tag(instance.seller_id),
+        *[category_tag(category_id) for category_id in _categories(instance)],
+    )
+
+
+@receiver([post_save, post_delete], sender=Product)
+def refresh_category_price_stats(sender, instance, **kwargs):
+    # The catalog-wide row is left to the periodic refresh_price_stats command.
+    for category_id in _categories(instance):
+        transaction.on_commit(partial(refresh_price_stats, category_id))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    invalidate_tags(CATALOG_TAG, category_tag(instance.id))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_autocomplete(sender, instance, signal, created=False, **kwargs):
+    # Saves that leave the indexed fields alone, such as stock changes, keep it
+    stored = getattr(instance, "_stored", None)
+    if (
+        signal is post_save
+        and not created
+        and stored is not None
+        and all(
+            stored[field] == getattr(instance, field)
+            for field in INDEXED_FIELDS[sender]
+        )
+    ):
+        return
+    invalidate_index()
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_pages(sender, instance, **kwargs):
+    if Review.product.is_cached(instance):
+        seller_id = instance.product.seller_id
+    else:
+        seller_id = (
+            Product.objects.filter(id=instance.product_id)
+            .values_list("seller_id", flat=True)
+            .first()
+        )
+    invalidate_tags(
+        product_tag(instance.product_id), seller_tag(seller_id) if seller_id else None
+    )
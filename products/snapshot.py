@@ -0,0 +1,368 @@
+"""
+Columnar catalog snapshots for offline analytics.
+
+``write_snapshot(path)`` streams products, order lines and reviews into one
+``.npy`` file per column, so reports can scan millions of rows without
+touching the database. Categories, sellers and statuses are dictionary
+encoded: the column holds integer codes (``-1`` for none) and
+``<column>.labels.json`` lists the values. Prices, including the unit price
+of each order line, are stored in cents and timestamps as ``datetime64[s]``
+(NaT for none).
+
+``open_snapshot(path)`` memory-maps the files. With NumPy installed columns
+are read-only ``numpy.memmap`` arrays; without it they are ``memoryview``
+objects over the mapped file, which still support indexing, slicing and
+``sum()`` without copying.
+"""
+
+import ast
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.utils import timezone as django_timezone
+
+from orders.models import ORDER_STATUSES, OrderItem
+
+from .models import Category, Product, Review
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SNAPSHOT_FORMAT = 1
+CHUNK_SIZE = 10_000
+MANIFEST = "manifest.json"
+NAT = -(2**63)
+NONE_CODE = -1
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_SIZE = 128
+BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+
+# dtype: (array typecode, .npy descr)
+INT64 = ("q", BYTE_ORDER + "i8")
+INT32 = ("i", BYTE_ORDER + "i4")
+INT8 = ("b", "|i1")
+BOOL = ("B", "|b1")
+DATETIME = ("q", BYTE_ORDER + "M8[s]")
+TYPECODES = {descr: typecode for typecode, descr in (INT64, INT32, INT8, BOOL)}
+TYPECODES[DATETIME[1]] = DATETIME[0]
+
+
+class ColumnWriter:
+    """Append values to a ``.npy`` file whose header is written on close"""
+
+    def __init__(self, path, dtype):
+        self.typecode, self.descr = dtype
+        self.length = 0
+        self.file = open(path, "wb")
+        self.file.write(b"\0" * NPY_HEADER_SIZE)
+
+    def extend(self, values):
+        chunk = array(self.typecode, values)
+        chunk.tofile(self.file)
+        self.length += len(chunk)
+
+    def close(self):
+        header = (
+            f"{{'descr': '{self.descr}', 'fortran_order': False, "
+            f"'shape': ({self.length},), }}"
+        ).encode("latin1")
+        padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(header) - 1
+        self.file.seek(0)
+        self.file.write(NPY_MAGIC)
+        self.file.write((len(header) + padding + 1).to_bytes(2, "little"))
+        self.file.write(header + b" " * padding + b"\n")
+        self.file.close()
+
+
+class Dictionary:
+    """Assign consecutive integer codes to the values of a column"""
+
+    def __init__(self, labels=()):
+        self.codes = {}
+        self.labels = []
+        for key, label in labels:
+            self.codes[key] = len(self.labels)
+            self.labels.append(label)
+
+    def encode(self, key, label=None):
+        if key is None:
+            return NONE_CODE
+        if key not in self.codes:
+            self.codes[key] = len(self.labels)
+            self.labels.append(key if label is None else label)
+        return self.codes[key]
+
+
+def cents(price):
+    return int((price * 100).to_integral_value())
+
+
+def epoch(value):
+    return int(value.timestamp()) if value is not None else NAT
+
+
+def _tables():
+    """
+    Yield ``(name, queryset, columns, dictionaries)`` per table; a column is
+    ``(name, dtype, getter)`` and ``dictionaries`` maps encoded columns to theirs
+    """
+    categories = Dictionary(Category.objects.order_by("pk").values_list("pk", "slug"))
+    sellers = Dictionary()
+    statuses = Dictionary((status, status) for status, _ in ORDER_STATUSES)
+
+    yield (
+        "products",
+        Product.objects.order_by("pk").values_list(
+            "pk",
+            "category_id",
+            "seller_id",
+            "seller__username",
+            "price",
+            "stock",
+            "is_active",
+            "created_at",
+        ),
+        [
+            ("id", INT64, lambda row: row[0]),
+            ("category", INT32, lambda row: categories.encode(row[1])),
+            ("seller", INT32, lambda row: sellers.encode(row[2], row[3])),
+            ("price_cents", INT64, lambda row: cents(row[4])),
+            ("stock", INT32, lambda row: row[5]),
+            ("is_active", BOOL, lambda row: row[6]),
+            ("created_at", DATETIME, lambda row: epoch(row[7])),
+        ],
+        {"category": categories, "seller": sellers},
+    )
+    yield (
+        "order_items",
+        OrderItem.objects.order_by("pk").values_list(
+            "pk",
+            "order_id",
+            "product_id",
+            "seller_id",
+            "seller__username",
+            "quantity",
+            "status",
+            "order__created_at",
+            "order__paid_at",
+            "unit_price",
+            "product__price",
+        ),
+        [
+            ("id", INT64, lambda row: row[0]),
+            ("order_id", INT64, lambda row: row[1]),
+            ("product_id", INT64, lambda row: row[2]),
+            ("seller", INT32, lambda row: sellers.encode(row[3], row[4])),
+            ("quantity", INT32, lambda row: row[5]),
+            ("status", INT32, lambda row: statuses.encode(row[6])),
+            ("created_at", DATETIME, lambda row: epoch(row[7])),
+            ("paid_at", DATETIME, lambda row: epoch(row[8])),
+            # Cart lines have no captured price yet and show the current one
+            (
+                "unit_price_cents",
+                INT64,
+                lambda row: cents(row[10] if row[9] is None else row[9]),
+            ),
+        ],
+        {"seller": sellers, "status": statuses},
+    )
+    yield (
+        "reviews",
+        Review.objects.order_by("pk").values_list(
+            "pk", "product_id", "user_id", "rating", "created_at"
+        ),
+        [
+            ("id", INT64, lambda row: row[0]),
+            ("product_id", INT64, lambda row: row[1]),
+            ("user_id", INT64, lambda row: row[2]),
+            ("rating", INT8, lambda row: row[3]),
+            ("created_at", DATETIME, lambda row: epoch(row[4])),
+        ],
+        {},
+    )
+
+
+def _write_table(directory, queryset, columns, chunk_size):
+    os.makedirs(directory)
+    writers = [
+        ColumnWriter(os.path.join(directory, f"{name}.npy"), dtype)
+        for name, dtype, _ in columns
+    ]
+    rows = 0
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            rows += _flush(chunk, columns, writers)
+    rows += _flush(chunk, columns, writers)
+    for writer in writers:
+        writer.close()
+    return rows
+
+
+def _flush(chunk, columns, writers):
+    for (_, _, getter), writer in zip(columns, writers):
+        writer.extend(getter(row) for row in chunk)
+    count = len(chunk)
+    chunk.clear()
+    return count
+
+
+def write_snapshot(path, chunk_size=CHUNK_SIZE):
+    """
+    Write a snapshot into the directory ``path``, replacing any previous one
+    only after the new one is complete. Returns the row count per table.
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+    try:
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": django_timezone.now().isoformat(),
+            "tables": {},
+        }
+        dictionaries = {}
+        for name, queryset, columns, encoded in _tables():
+            rows = _write_table(
+                os.path.join(staging, name), queryset, columns, chunk_size
+            )
+            manifest["tables"][name] = {
+                "rows": rows,
+                "columns": {column: dtype[1] for column, dtype, _ in columns},
+            }
+            dictionaries[name] = encoded
+
+        # Dictionaries are shared between tables, so write them once all
+        # tables have added their values
+        for name, encoded in dictionaries.items():
+            for column, dictionary in encoded.items():
+                labels_path = os.path.join(staging, name, f"{column}.labels.json")
+                with open(labels_path, "w", encoding="utf-8") as labels_file:
+                    json.dump(dictionary.labels, labels_file, ensure_ascii=False)
+            manifest["tables"][name]["labels"] = sorted(encoded)
+
+        with open(os.path.join(staging, MANIFEST), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        previous = None
+        if os.path.exists(path):
+            previous = f"{staging}.old"
+            os.rename(path, previous)
+        os.rename(staging, path)
+        if previous:
+            shutil.rmtree(previous)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return {name: table["rows"] for name, table in manifest["tables"].items()}
+
+
+def _read_header(mapped):
+    if mapped[: len(NPY_MAGIC)] != NPY_MAGIC:
+        raise ValueError("Not a .npy version 1.0 file")
+    start = len(NPY_MAGIC) + 2
+    length = int.from_bytes(mapped[len(NPY_MAGIC) : start], "little")
+    header = ast.literal_eval(mapped[start : start + length].decode("latin1"))
+    return header, start + length
+
+
+class Snapshot:
+    """Memory-mapped columns of a snapshot written by ``write_snapshot``"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest["format"] != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {self.manifest['format']}")
+        self.created_at = datetime.fromisoformat(self.manifest["created_at"])
+        self._maps = []
+        self._columns = {}
+
+    @property
+    def tables(self):
+        return self.manifest["tables"]
+
+    def column(self, table, name):
+        key = (table, name)
+        if key not in self._columns:
+            self._columns[key] = self._load(
+                os.path.join(self.path, table, f"{name}.npy")
+            )
+        return self._columns[key]
+
+    def _load(self, path):
+        if numpy is not None:
+            return numpy.load(path, mmap_mode="r")
+        with open(path, "rb") as column_file:
+            header, offset = _read_header(column_file.read(NPY_HEADER_SIZE))
+            if header["descr"][0] not in (BYTE_ORDER, "|"):
+                raise ValueError("Snapshot was written with a different byte order")
+            typecode = TYPECODES[header["descr"]]
+            if not header["shape"][0]:
+                return memoryview(b"").cast(typecode)
+            mapped = mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)[offset:].cast(typecode)
+
+    def table(self, name):
+        """All columns of a table as a dict"""
+        return {
+            column: self.column(name, column) for column in self.tables[name]["columns"]
+        }
+
+    def labels(self, table, column):
+        """Values behind the integer codes of a dictionary-encoded column"""
+        path = os.path.join(self.path, table, f"{column}.labels.json")
+        with open(path, encoding="utf-8") as labels_file:
+            return json.load(labels_file)
+
+    def close(self):
+        """Unmap the files; memoryview columns must not be used afterwards"""
+        for column in self._columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns.clear()
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                # A slice of a column is still referenced; the map is freed
+                # with it
+                pass
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def open_snapshot(path):
+    return Snapshot(path)
+
+
+def to_datetime(seconds):
+    """Convert a stored timestamp back to an aware datetime, or None for NaT"""
+    seconds = int(seconds)
+    if seconds == NAT:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def to_price(price_cents):
+    return Decimal(int(price_cents)).scaleb(-2)
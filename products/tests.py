@@ -1 +1,727 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from marketplace.page_cache import _tag_versions, product_tag
+from marketplace.slugs import slugify
+from marketplace.testing import (
+    QueryBudgetMixin,
+    create_seller,
+    query_budget,
+    seed_customers,
+    seed_products,
+)
+from orders.models import Order, OrderItem, SellerOrder
+from products.autocomplete import (
+    INDEX_KEY,
+    LOCK_KEY,
+    VERSION_KEY,
+    _shard_key,
+    invalidate_index,
+    suggest,
+)
+from products.inventory import (
+    apply_inventory_changes,
+    build_inventory_report,
+    parse_inventory_rows,
+)
+from products.management.commands.marketplace_doctor import Command as DoctorCommand
+from products.models import (
+    Category,
+    CategoryPriceStats,
+    PriceChangeBatch,
+    PriceRule,
+    Product,
+    ProductRecommendation,
+    Review,
+    ScheduledChange,
+    WishlistAlert,
+    WishlistItem,
+)
+from products.price_stats import compute_price_stats, refresh_price_stats
+from products.pricing import (
+    apply_price_rules,
+    evaluate_rules,
+    rollback_price_batch,
+    to_cents,
+)
+from products.recommendations import update_recommendations
+from products.scheduling import apply_scheduled_changes
+from products.signals import products_bulk_changed
+from products.snapshot import NONE_CODE, open_snapshot, to_price, write_snapshot
+from products.wishlist import detect_wishlist_changes
+
+
+class ProductQueryBudgetTests(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        "products:list": 4,
+        "products:detail": 4,
+        "products:reviews": 2,
+        "products:seller_dashboard": 5,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.category = Category.objects.create(name="Категорія")
+        cls.product = Product.objects.create(
+            name="Головний товар", seller=cls.seller, category=cls.category, price=10
+        )
+
+    def seed(self, count):
+        """Bring products (with a review each) and reviews of one product to count"""
+        products = seed_products(self.seller, count, category=self.category)
+        customers = seed_customers(products)
+        Review.objects.bulk_create(
+            review
+            for product, customer in zip(products, customers)
+            for review in (
+                Review(product=product, user=customer, rating=4, comment="Добре"),
+                Review(product=self.product, user=customer, rating=5, comment="Чудово"),
+            )
+        )
+
+    def test_product_list(self):
+        self.assertQueriesFlat("products:list")
+
+    def test_product_detail(self):
+        self.assertQueriesFlat("products:detail", self.product.slug)
+
+    def test_product_reviews(self):
+        self.assertQueriesFlat("products:reviews", self.product.slug)
+
+    def test_seller_dashboard(self):
+        self.client.force_login(self.seller)
+        self.assertQueriesFlat("products:seller_dashboard")
+
+    def test_query_budget_reports_sql(self):
+        with self.assertRaisesMessage(AssertionError, 'SELECT COUNT(*) AS "__count"'):
+            with query_budget(0):
+                Product.objects.count()
+
+
+class InventoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.ball = Product.objects.create(
+            name="М'яч", slug="ball", seller=cls.seller, price=10, stock=5
+        )
+        cls.book = Product.objects.create(
+            name="Книга", slug="book", seller=cls.seller, price=20, stock=1
+        )
+
+    def test_parse_semicolons_with_decimal_commas(self):
+        rows = parse_inventory_rows("ball;15,50;3;1\nbook;12,00;2;0")
+        self.assertEqual(
+            [values for _, values in rows],
+            [
+                {"slug": "ball", "price": "15,50", "stock": "3", "is_active": "1"},
+                {"slug": "book", "price": "12,00", "stock": "2", "is_active": "0"},
+            ],
+        )
+
+    def test_parse_header_and_delimiters(self):
+        for text in (
+            "slug,price,stock,is_active\nball,15.50,3,1",
+            "\ufeffslug\tprice\tstock\tis_active\nball\t15.50\t3\t1",
+            'slug;price;stock;is_active\n"ball";"15,50";3;так',
+        ):
+            with self.subTest(text=text):
+                [(line, values)] = parse_inventory_rows(text)
+                self.assertEqual(
+                    (line, values["slug"], values["stock"]), (2, "ball", "3")
+                )
+
+    def test_report_validates_rows(self):
+        rows = parse_inventory_rows("ball;-1;;\nmissing;1;1;1\nbook;;x;maybe")
+        report, changed = build_inventory_report(self.seller, rows)
+        self.assertEqual(changed, [])
+        self.assertEqual(
+            [entry["errors"] for entry in report],
+            [
+                ["Ціна поза допустимим діапазоном"],
+                ["Товар не знайдено"],
+                ["Некоректна кількість", "Некоректне значення активності"],
+            ],
+        )
+
+    def test_apply_writes_only_changed_fields(self):
+        rows = parse_inventory_rows("ball;12,50;;\nbook;;7;0")
+        _, changed = build_inventory_report(self.seller, rows)
+        self.assertEqual(
+            [(product.slug, fields) for product, fields in changed],
+            [("ball", ["price"]), ("book", ["stock", "is_active"])],
+        )
+        # A checkout sells a ball between the preview and the import
+        Product.objects.filter(pk=self.ball.pk).update(stock=4)
+
+        self.assertEqual(apply_inventory_changes(self.seller, changed), 2)
+        self.ball.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual((self.ball.price, self.ball.stock), (Decimal("12.50"), 4))
+        self.assertEqual((self.book.stock, self.book.is_active), (7, False))
+
+    def test_view_previews_then_applies(self):
+        self.client.force_login(self.seller)
+        url = reverse("products:bulk_inventory")
+        data = {"rows": "slug;price;stock;is_active\nball;9,99;;", "preview": "on"}
+
+        response = self.client.post(url, data)
+        self.assertEqual(
+            response.context["report"][0]["changes"]["price"][1], Decimal("9.99")
+        )
+        self.assertEqual(Product.objects.get(pk=self.ball.pk).price, 10)
+
+        del data["preview"]
+        self.client.post(url, data)
+        self.assertEqual(Product.objects.get(pk=self.ball.pk).price, Decimal("9.99"))
+
+        response = self.client.get(url, {"export": "csv"})
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            ["slug,price,stock,is_active", "ball,9.99,5,1", "book,20.00,1,1"],
+        )
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = create_seller()
+        category = Category.objects.create(name="Зимовий одяг")
+        for name in ["Зимова куртка", "Куртка легка", "Шапка"]:
+            Product.objects.create(
+                name=name, seller=seller, category=category, price=100
+            )
+
+    def setUp(self):
+        # Rolled back rows do not roll back the index built from them
+        cache.clear()
+
+    def test_suggests_by_word_prefix_without_queries(self):
+        url = reverse("products:autocomplete")
+        self.client.get(url, {"q": "ку"})
+        with query_budget(0):
+            response = self.client.get(url, {"q": "ку"})
+        labels = [result["label"] for result in response.json()["results"]]
+        self.assertEqual(labels, ["Зимова куртка", "Куртка легка"])
+
+    def test_matches_transliterated_prefix(self):
+        response = self.client.get(reverse("products:autocomplete"), {"q": "zymov"})
+        labels = [result["label"] for result in response.json()["results"]]
+        self.assertEqual(labels, ["Зимова куртка", "Зимовий одяг"])
+        self.assertIn("HX-Request", response["Vary"])
+
+    def test_serves_stale_index_while_another_worker_rebuilds(self):
+        self.assertEqual(len(suggest("шап")), 1)
+        Product.objects.filter(name="Шапка").update(name="Шарф")
+        invalidate_index()
+
+        cache.add(LOCK_KEY, 1)
+        self.addCleanup(cache.delete, LOCK_KEY)
+        with query_budget(0):
+            self.assertEqual(len(suggest("шап")), 1)
+
+        cache.delete(LOCK_KEY)
+        self.assertEqual(suggest("шап"), [])
+        self.assertEqual(len(suggest("шар")), 1)
+
+    def test_index_is_stored_in_prefix_shards(self):
+        suggest("ку")
+        version, shards = cache.get(INDEX_KEY)
+        self.assertIn("ку", shards)
+        self.assertIn("zy", shards)
+        keys = [entry[0] for entry in cache.get(_shard_key(version, "ку"))]
+        self.assertEqual(keys, ["куртка", "куртка легка"])
+
+    def test_only_indexed_fields_invalidate(self):
+        product = Product.objects.get(name="Шапка")
+        version = cache.get(VERSION_KEY)
+
+        product.stock = 3
+        product.save()
+        self.assertEqual(cache.get(VERSION_KEY), version)
+
+        product.is_active = False
+        product.save()
+        self.assertNotEqual(cache.get(VERSION_KEY), version)
+        self.assertEqual(suggest("шап"), [])
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.buyer = User.objects.create_user("buyer")
+        category = Category.objects.create(name="Книги", slug="knyhy")
+        cls.book = Product.objects.create(
+            name="Книга",
+            slug="knyha",
+            seller=cls.seller,
+            category=category,
+            price=Decimal("12.34"),
+            stock=3,
+        )
+        Product.objects.create(
+            name="Інше", slug="inshe", seller=cls.seller, price=5, is_active=False
+        )
+        Review.objects.create(product=cls.book, user=cls.buyer, rating=4)
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            rows = write_snapshot(f"{directory}/catalog", chunk_size=1)
+            self.assertEqual(rows, {"products": 2, "order_items": 0, "reviews": 1})
+
+            with open_snapshot(f"{directory}/catalog") as snapshot:
+                products = snapshot.table("products")
+                self.assertEqual(list(products["id"]), [self.book.pk, self.book.pk + 1])
+                self.assertEqual(to_price(products["price_cents"][0]), Decimal("12.34"))
+                self.assertEqual(sum(products["is_active"]), 1)
+                self.assertEqual(products["category"][1], NONE_CODE)
+                categories = snapshot.labels("products", "category")
+                self.assertEqual(categories[products["category"][0]], "knyhy")
+                sellers = snapshot.labels("products", "seller")
+                self.assertEqual(sellers[products["seller"][0]], "seller")
+                self.assertEqual(len(snapshot.column("order_items", "id")), 0)
+                self.assertEqual(list(snapshot.column("reviews", "rating")), [4])
+
+    def test_order_lines_keep_unit_price_in_cents(self):
+        paid = Order.objects.create(
+            customer=self.buyer, status="paid", paid_at=timezone.now()
+        )
+        OrderItem.objects.create(
+            order=paid, product=self.book, quantity=2, unit_price=Decimal("11.50")
+        )
+        cart = Order.objects.create(customer=self.buyer)
+        OrderItem.objects.create(order=cart, product=self.book)
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_snapshot(f"{directory}/catalog")
+            with open_snapshot(f"{directory}/catalog") as snapshot:
+                prices = snapshot.column("order_items", "unit_price_cents")
+                self.assertEqual(list(prices), [1150, 1234])
+                self.assertEqual(to_price(prices[0]), Decimal("11.50"))
+
+
+class PriceStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.phones, cls.tablets = Category.objects.bulk_create(
+            [
+                Category(name="Телефони", slug="phones"),
+                Category(name="Планшети", slug="tablets"),
+            ]
+        )
+
+    def add_products(self, *prices):
+        return Product.objects.bulk_create(
+            Product(
+                name=f"Товар {index}",
+                slug=f"product-{index}",
+                seller=self.seller,
+                category=self.phones,
+                price=price,
+            )
+            for index, price in enumerate(prices)
+        )
+
+    def test_bucket_edges(self):
+        self.add_products(1, 2, "2.99", 3, 4, 5, 6, 7, 8, 10)
+        stats = compute_price_stats(Product.objects.all())
+        self.assertEqual(
+            [
+                (bucket["min"], bucket["max"], bucket["count"])
+                for bucket in stats["buckets"]
+            ],
+            [
+                ("1.00", "2.98", 2),
+                ("2.99", "3.99", 2),
+                ("4.00", "5.99", 2),
+                ("6.00", "7.99", 2),
+                ("8.00", "10.00", 2),
+            ],
+        )
+
+    def test_equal_prices_share_one_bucket(self):
+        self.add_products(*[5] * 7)
+        stats = compute_price_stats(Product.objects.all())
+        self.assertEqual(stats["buckets"], [{"min": "5.00", "max": "5.00", "count": 7}])
+        self.assertEqual(compute_price_stats(Product.objects.none())["buckets"], [])
+
+    def test_moved_product_refreshes_both_categories(self):
+        [product] = self.add_products(10)
+        refresh_price_stats(self.phones.id)
+
+        product.category = self.tablets
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertEqual(self.phones.price_stats.product_count, 0)
+        self.assertEqual(
+            CategoryPriceStats.objects.get(category=self.tablets).product_count, 1
+        )
+
+    def test_bulk_change_refreshes_after_commit(self):
+        [product] = self.add_products(10)
+        with self.captureOnCommitCallbacks() as callbacks:
+            products_bulk_changed([product.id], [self.seller.id], [self.phones.id])
+        self.assertFalse(CategoryPriceStats.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.phones.price_stats.product_count, 1)
+
+
+class PriceRuleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.sports = Category.objects.create(name="Спорт", slug="sport")
+        cls.ball = Product.objects.create(
+            name="М'яч",
+            slug="miach",
+            seller=cls.seller,
+            category=cls.sports,
+            price=Decimal("20.00"),
+        )
+        cls.book = Product.objects.create(
+            name="Книга", slug="knyha", seller=cls.seller, price=Decimal("10.05")
+        )
+
+    def rule(self, **kwargs):
+        return PriceRule.objects.create(seller=self.seller, name="rule", **kwargs)
+
+    def test_rules_run_in_order_with_exact_rounding(self):
+        discount = self.rule(category=self.sports, action="percent", value=-15)
+        ending = self.rule(action="amount", value=Decimal("0.30"), rounding="99")
+        changes, invalid = evaluate_rules(self.seller, [discount, ending])
+        self.assertEqual(invalid, [])
+        # 20.00 -15% = 17.00, +0.30 = 17.30 -> 16.99; 10.05 + 0.30 = 10.35 -> 9.99
+        self.assertEqual(
+            sorted(changes), [(self.ball.pk, 2000, 1699), (self.book.pk, 1005, 999)]
+        )
+
+    def test_ties_round_half_up(self):
+        rule = self.rule(action="percent", value=-10)
+        changes, _ = evaluate_rules(self.seller, [rule])
+        # 10.05 -10% = 9.045, where banker's rounding would give 9.04
+        self.assertIn((self.book.pk, 1005, 905), changes)
+        self.assertEqual([to_cents(v) for v in ("0.125", "-0.125")], [13, -13])
+
+    def test_out_of_range_prices_are_reported(self):
+        rule = self.rule(action="amount", value=-15)
+        changes, invalid = evaluate_rules(self.seller, [rule])
+        self.assertEqual(invalid, [(self.book.pk, 1005, -495)])
+
+    def test_preview_does_not_write(self):
+        rule = self.rule(action="percent", value=10)
+        self.client.force_login(self.seller)
+        response = self.client.post(
+            reverse("products:price_rules"),
+            {"form": "apply", "rules": [rule.pk], "preview": "on"},
+        )
+        self.assertEqual(
+            response.context["preview"]["rows"][0][1:],
+            (Decimal("20.00"), Decimal("22.00")),
+        )
+        self.ball.refresh_from_db()
+        self.assertEqual(self.ball.price, Decimal("20.00"))
+        self.assertFalse(PriceChangeBatch.objects.exists())
+
+    def test_apply_and_rollback(self):
+        rule = self.rule(action="set", value=5)
+        changes, _ = evaluate_rules(self.seller, [rule])
+        batch = apply_price_rules(self.seller, [rule], changes)
+        self.assertEqual(batch.changes.count(), 2)
+        self.assertEqual(
+            set(Product.objects.values_list("price", flat=True)), {Decimal("5.00")}
+        )
+
+        Product.objects.filter(pk=self.book.pk).update(price=7)
+        self.assertEqual(rollback_price_batch(batch), (1, 1))
+        self.ball.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(self.ball.price, Decimal("20.00"))
+        self.assertEqual(self.book.price, Decimal("7.00"))
+        self.assertEqual(rollback_price_batch(batch), (0, 0))
+
+
+class ScheduledChangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.product = Product.objects.create(
+            name="Новинка",
+            slug="novynka",
+            seller=cls.seller,
+            price=100,
+            is_active=False,
+        )
+
+    def schedule(self, minutes, action, price=None):
+        return ScheduledChange.objects.create(
+            product=self.product,
+            action=action,
+            price=price,
+            due_at=timezone.now() + timedelta(minutes=minutes),
+        )
+
+    def test_applies_only_due_changes_latest_last(self):
+        self.schedule(-10, "price", 80)
+        self.schedule(-5, "price", 70)
+        self.schedule(-1, "activate")
+        later = self.schedule(60, "deactivate")
+
+        self.assertEqual(apply_scheduled_changes(batch_size=2), 3)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.is_active)
+        self.assertEqual(self.product.price, Decimal("70.00"))
+        later.refresh_from_db()
+        self.assertIsNone(later.applied_at)
+        self.assertEqual(apply_scheduled_changes(), 0)
+
+    def test_sale_restores_current_price(self):
+        self.client.force_login(self.seller)
+        start = timezone.localtime() + timedelta(days=1)
+        response = self.client.post(
+            reverse("products:schedule", args=[self.product.slug]),
+            {
+                "action": "price",
+                "price": "79.99",
+                "due_at": start.strftime("%Y-%m-%dT%H:%M"),
+                "ends_at": (start + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M"),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(self.product.scheduled_changes.values_list("price", flat=True)),
+            [Decimal("79.99"), Decimal("100.00")],
+        )
+        response = self.client.get(response.url)
+        self.assertEqual(len(response.context["pending"]), 2)
+
+    def test_negative_price_is_rejected(self):
+        self.client.force_login(self.seller)
+        due_at = timezone.localtime() + timedelta(days=1)
+        response = self.client.post(
+            reverse("products:schedule", args=[self.product.slug]),
+            {
+                "action": "price",
+                "price": "-1",
+                "due_at": due_at.strftime("%Y-%m-%dT%H:%M"),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("price", response.context["form"].errors)
+        self.assertFalse(self.product.scheduled_changes.exists())
+
+    def test_cancel(self):
+        change = self.schedule(60, "activate")
+        url = reverse("products:schedule", args=[self.product.slug])
+        self.client.force_login(self.seller)
+        self.assertEqual(self.client.post(url, {"cancel": "abc"}).status_code, 404)
+        self.assertEqual(self.client.post(url, {"cancel": change.id}).status_code, 302)
+        self.assertFalse(ScheduledChange.objects.exists())
+
+
+class WishlistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.buyer = User.objects.create_user("buyer", password="pass")
+        cls.cheaper = Product.objects.create(
+            name="Дешевшає", slug="deshevshaie", seller=cls.seller, price=50, stock=5
+        )
+        cls.restocked = Product.objects.create(
+            name="Повертається", slug="povertaietsia", seller=cls.seller, price=20
+        )
+        cls.unchanged = Product.objects.create(
+            name="Без змін", slug="bez-zmin", seller=cls.seller, price=10, stock=1
+        )
+
+    def test_toggle(self):
+        self.client.force_login(self.buyer)
+        url = reverse("products:wishlist_toggle", args=[self.cheaper.pk])
+        self.client.post(url)
+        self.assertTrue(self.buyer.wishlist_items.filter(product=self.cheaper).exists())
+        self.client.post(url)
+        self.assertFalse(self.buyer.wishlist_items.exists())
+
+    def test_detects_changes_since_last_run(self):
+        Product.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        for product in (self.cheaper, self.restocked, self.unchanged):
+            WishlistItem.objects.create(
+                user=self.buyer,
+                product=product,
+                price=product.price,
+                in_stock=product.stock > 0,
+            )
+        self.assertEqual(detect_wishlist_changes(), 0)
+
+        Product.objects.filter(pk=self.cheaper.pk).update(
+            price=40, updated_at=timezone.now()
+        )
+        Product.objects.filter(pk=self.restocked.pk).update(
+            stock=3, updated_at=timezone.now()
+        )
+        # Would alert if rows of products not updated since the watermark
+        # were read
+        WishlistItem.objects.filter(product=self.unchanged).update(price=99)
+        self.assertEqual(detect_wishlist_changes(), 2)
+
+        alerts = dict(WishlistAlert.objects.values_list("product_id", "kind"))
+        self.assertEqual(
+            alerts, {self.cheaper.pk: "price_drop", self.restocked.pk: "restock"}
+        )
+        self.assertEqual(detect_wishlist_changes(), 0)
+
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse("products:wishlist"))
+        self.assertEqual(len(response.context["alerts"]), 2)
+        self.assertFalse(WishlistAlert.objects.filter(read_at__isnull=True).exists())
+
+    def test_late_commit_is_not_missed(self):
+        WishlistItem.objects.create(
+            user=self.buyer, product=self.cheaper, price=self.cheaper.price
+        )
+        self.assertEqual(detect_wishlist_changes(), 0)
+
+        # Stamped before the previous run, but committed after it
+        Product.objects.filter(pk=self.cheaper.pk).update(
+            price=40, updated_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(detect_wishlist_changes(), 1)
+        self.assertEqual(detect_wishlist_changes(), 0)
+
+
+class MarketplaceDoctorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.customer = User.objects.create_user("customer", password="pass")
+        cls.category = Category.objects.create(name="Категорія")
+        cls.product = Product.objects.create(
+            name="Товар", seller=cls.seller, category=cls.category, price=10, stock=5
+        )
+
+    def test_review_chunks_are_raw_deleted_and_invalidated(self):
+        Review.objects.create(
+            product=self.product, user=self.customer, rating=5, comment="Добре"
+        )
+        tag = product_tag(self.product.id)
+        version = _tag_versions([tag])[tag]
+
+        command = DoctorCommand()
+        command.dry_run, command.chunk_size = False, 10
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = command.delete_in_chunks(
+                Review.objects.all(), tags=command.review_tags
+            )
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(Review.objects.exists())
+        self.assertNotEqual(_tag_versions([tag])[tag], version)
+
+    def test_empty_slug_skips_every_taken_candidate(self):
+        Product.objects.filter(pk=self.product.pk).update(slug="")
+        base = slugify(self.product.name)
+        for slug in (base, f"{base}-{self.product.id}", f"{base}-{self.product.id}-1"):
+            Product.objects.create(name="Інший", slug=slug, seller=self.seller, price=1)
+
+        call_command("marketplace_doctor", "--only", "empty_slugs", stdout=StringIO())
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.slug, f"{base}-{self.product.id}-2")
+
+    def test_stale_counters(self):
+        order = Order.objects.create(
+            customer=self.customer, status="paid", paid_at=timezone.now()
+        )
+        seller_order = SellerOrder.objects.create(
+            order=order, seller=self.seller, subtotal=1, items_count=5
+        )
+        OrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=3,
+            seller=self.seller,
+            seller_order=seller_order,
+            status="paid",
+            unit_price=10,
+        )
+        CategoryPriceStats.objects.create(category=self.category, product_count=7)
+
+        call_command(
+            "marketplace_doctor", "--only", "stale_counters", stdout=StringIO()
+        )
+
+        seller_order.refresh_from_db()
+        self.assertEqual((seller_order.items_count, seller_order.subtotal), (1, 30))
+        stats = CategoryPriceStats.objects.get(category=self.category)
+        self.assertEqual((stats.product_count, stats.min_price), (1, 10))
+        output = StringIO()
+        call_command("marketplace_doctor", "--dry-run", stdout=output)
+        self.assertIn("stale_counters: 0 found", output.getvalue())
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.customer = User.objects.create_user("customer", password="pass")
+        cls.first, cls.second = Product.objects.bulk_create(
+            Product(
+                name=f"Товар {number}",
+                slug=f"product-{number}",
+                seller=cls.seller,
+                price=10,
+            )
+            for number in range(2)
+        )
+
+    def place_order(self, paid_at):
+        order = Order.objects.create(
+            customer=self.customer, status="paid", paid_at=paid_at
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product)
+            for product in (self.first, self.second)
+        )
+
+    def co_purchases(self):
+        return ProductRecommendation.objects.get(
+            product=self.first, recommended=self.second
+        ).orders
+
+    def test_late_commit_is_counted_once(self):
+        self.place_order(timezone.now() - timedelta(minutes=1))
+        self.assertEqual(update_recommendations(), (1, 2))
+
+        # Paid before the previous run, but committed after it
+        self.place_order(timezone.now() - timedelta(seconds=1))
+        self.assertEqual(update_recommendations(), (1, 2))
+        self.assertEqual(self.co_purchases(), 2)
+
+        self.assertEqual(update_recommendations(), (0, 0))
+        self.assertEqual(self.co_purchases(), 2)
+
+    def test_incremental_run_filters_on_indexed_paid_at(self):
+        self.place_order(timezone.now() - timedelta(minutes=1))
+        update_recommendations()
+
+        with CaptureQueriesContext(connection) as queries:
+            update_recommendations()
+        [sql] = [q["sql"] for q in queries if 'FROM "orders_orderitem"' in q["sql"]]
+        self.assertNotIn("COALESCE", sql)
+        self.assertIn('"orders_order"."paid_at" >', sql)
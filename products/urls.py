@@ -7,11 +7,32 @@ app_name = "products"
 urlpatterns = [
     path("", views.product_list, name="list"),
     path("create/", views.product_create, name="create"),
+    path("autocomplete/", views.autocomplete, name="autocomplete"),
+    path("wishlist/", views.wishlist, name="wishlist"),
+    path(
+        "wishlist/<int:product_id>/toggle/",
+        views.wishlist_toggle,
+        name="wishlist_toggle",
+    ),
     path("dashboard/", views.seller_dashboard, name="seller_dashboard"),
+    path("dashboard/inventory/", views.bulk_inventory, name="bulk_inventory"),
+    path("dashboard/price-rules/", views.price_rules, name="price_rules"),
+    path(
+        "dashboard/price-rules/<int:rule_id>/delete/",
+        views.price_rule_delete,
+        name="price_rule_delete",
+    ),
+    path(
+        "dashboard/price-changes/<int:batch_id>/rollback/",
+        views.price_batch_rollback,
+        name="price_batch_rollback",
+    ),
     path("review/<int:review_id>/edit/", views.edit_review, name="edit_review"),
     path("review/<int:review_id>/delete/", views.delete_review, name="delete_review"),
-    path("<slug:slug>/edit/", views.product_update, name="update"),
-    path("<slug:slug>/delete/", views.product_delete, name="delete"),
-    path("<slug:slug>/review/", views.add_review, name="add_review"),
-    path("<slug:slug>/", views.product_detail, name="detail"),
+    path("<uslug:slug>/edit/", views.product_update, name="update"),
+    path("<uslug:slug>/delete/", views.product_delete, name="delete"),
+    path("<uslug:slug>/schedule/", views.product_schedule, name="schedule"),
+    path("<uslug:slug>/review/", views.add_review, name="add_review"),
+    path("<uslug:slug>/reviews/", views.product_reviews, name="reviews"),
+    path("<uslug:slug>/", views.product_detail, name="detail"),
 ]
@@ -1,22 +1,70 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db.models import Avg, Count, Q
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_http_methods
 
+from marketplace.page_cache import (
+    CATALOG_TAG,
+    add_page_cache_tags,
+    cache_anonymous_page,
+    category_tag,
+    product_tag,
+    seller_tag,
+)
+from marketplace.throttling import idempotent, rate_limit
+from orders.analytics import ANALYTICS_RANGES, sales_series
 from orders.models import PaymentMethod
 
+from .autocomplete import suggest, suggestion_url
 from .filters import ProductFilter
-from .forms import ProductForm, ReviewForm
-from .models import Category, Product, Review
+from .forms import (
+    InventoryUploadForm,
+    PriceRuleApplyForm,
+    PriceRuleForm,
+    ProductForm,
+    ReviewForm,
+    ScheduledChangeForm,
+)
+from .inventory import (
+    apply_inventory_changes,
+    build_inventory_report,
+    export_inventory_csv,
+    parse_inventory_rows,
+)
+from .models import (
+    Category,
+    PriceChangeBatch,
+    PriceRule,
+    Product,
+    Review,
+    ScheduledChange,
+    WishlistAlert,
+    WishlistItem,
+)
 from .permissions import require_seller
-
-
+from .price_stats import price_stats_for
+from .pricing import (
+    PREVIEW_ROWS,
+    apply_price_rules,
+    evaluate_rules,
+    rollback_price_batch,
+    to_price,
+)
+from .recommendations import recommended_products
+from .reviews import rating_summary, review_page
+from .wishlist import toggle_wishlist
+
+
+@cache_anonymous_page(tags=lambda request: [CATALOG_TAG])
 def product_list(request):
     qs = (
-        Product.objects.select_related("category", "seller")
+        Product.objects.select_related("category", "seller__seller_profile")
         .filter(is_active=True)
         .order_by("-created_at")
     )
@@ -35,18 +83,43 @@ def product_list(request):
         "filter": filt,
         "page_obj": page_obj,
         "categories": Category.objects.all(),
+        "price_stats": price_stats_for(request.GET.get("category")),
     }
 
     if request.headers.get("HX-Request"):
-        return render(request, "products/product_grid.html", ctx)
+        # The price sliders depend on the category, so refresh them out of band.
+        return render(
+            request, "products/product_grid.html", {**ctx, "price_filter_oob": True}
+        )
 
     return render(request, "products/product_list.html", ctx)
 
 
+def autocomplete(request):
+    """Top suggestions for the search box as JSON, or as a fragment for HTMX"""
+    suggestions = suggest(request.GET.get("q", ""))
+    for suggestion in suggestions:
+        suggestion["url"] = suggestion_url(suggestion)
+
+    if request.headers.get("HX-Request"):
+        response = render(
+            request, "products/_autocomplete.html", {"suggestions": suggestions}
+        )
+    else:
+        response = JsonResponse({"results": suggestions})
+    # The same URL returns HTML or JSON, so shared caches must key on HX-Request
+    patch_vary_headers(response, ["HX-Request"])
+    response["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@cache_anonymous_page()
+@idempotent()
+@rate_limit("review", "5/m")
 def product_detail(request, slug):
     try:
         product = get_object_or_404(
-            Product.objects.select_related("category", "seller"),
+            Product.objects.select_related("category", "seller__seller_profile"),
             slug=slug,
             is_active=True,
         )
@@ -55,15 +128,18 @@ def product_detail(request, slug):
         messages.error(request, "Помилка при завантаженні товару")
         return redirect("products:list")
 
-    try:
-        reviews = (
-            product.reviews.filter(user__isnull=False)
-            .select_related("user")
-            .order_by("-created_at")
-        )
-    except Exception as e:
-        print(f"Error getting reviews: {e}")
-        reviews = product.reviews.filter(user__isnull=False).order_by("-created_at")
+    add_page_cache_tags(
+        request,
+        product_tag(product.id),
+        seller_tag(product.seller_id),
+        category_tag(product.category_id) if product.category_id else None,
+    )
+
+    in_wishlist = (
+        request.user.is_authenticated
+        and not request.user.is_seller
+        and WishlistItem.objects.filter(user=request.user, product=product).exists()
+    )
 
     user_review = None
     if request.user.is_authenticated and not request.user.is_seller:
@@ -100,21 +176,24 @@ def product_detail(request, slug):
 
     payment_methods = PaymentMethod.objects.filter(is_active=True)
 
+    reviews, next_cursor = review_page(
+        product,
+        request.GET.get("cursor"),
+        exclude_user=request.user if user_review else None,
+    )
+
     context = {
         "product": product,
         "reviews": reviews,
+        "next_cursor": next_cursor,
         "user_review": user_review,
+        "in_wishlist": in_wishlist,
         "review_form": form,
         "payment_methods": payment_methods,
+        "recommendations": recommended_products(product),
+        **rating_summary(product),
     }
 
-    try:
-        for review in reviews:
-            if review.user is None:
-                print(f"Warning: Review {review.id} has no user")
-    except Exception as e:
-        print(f"Error checking reviews: {e}")
-
     try:
         return render(request, "products/product_detail.html", context)
     except Exception as e:
@@ -123,7 +202,29 @@ def product_detail(request, slug):
         return redirect("products:list")
 
 
+@cache_anonymous_page()
+def product_reviews(request, slug):
+    """Next page of product reviews, rendered as a fragment for HTMX"""
+    product = get_object_or_404(Product, slug=slug, is_active=True)
+    add_page_cache_tags(request, product_tag(product.id))
+
+    exclude_user = None
+    if request.user.is_authenticated and not request.user.is_seller:
+        exclude_user = request.user
+    reviews, next_cursor = review_page(
+        product, request.GET.get("cursor"), exclude_user=exclude_user
+    )
+
+    return render(
+        request,
+        "products/_review_list.html",
+        {"product": product, "reviews": reviews, "next_cursor": next_cursor},
+    )
+
+
 @login_required
+@idempotent()
+@rate_limit("review", "5/m")
 def add_review(request, slug):
     """Add a review to a product"""
     if request.user.is_seller:
@@ -257,6 +358,53 @@ def product_update(request, slug):
     )
 
 
+@login_required
+@require_http_methods(["GET", "POST"])
+def product_schedule(request, slug):
+    """Schedule activation, deactivation or a price change for a product"""
+    require_seller(request.user)
+    product = get_object_or_404(Product, slug=slug, seller=request.user)
+
+    if request.method == "POST" and request.POST.get("cancel"):
+        try:
+            change_id = int(request.POST["cancel"])
+        except ValueError:
+            raise Http404("Зміну не знайдено")
+        deleted, _ = ScheduledChange.objects.filter(
+            id=change_id, product=product, applied_at__isnull=True
+        ).delete()
+        if deleted:
+            messages.success(request, "Заплановану зміну скасовано.")
+        else:
+            messages.error(request, "Зміну вже застосовано або скасовано.")
+        return redirect("products:schedule", slug=product.slug)
+
+    if request.method == "POST":
+        form = ScheduledChangeForm(request.POST)
+        if form.is_valid():
+            change = form.save(commit=False)
+            change.product = product
+            change.save()
+            if form.cleaned_data["ends_at"]:
+                ScheduledChange.objects.create(
+                    product=product,
+                    action="price",
+                    price=product.price,
+                    due_at=form.cleaned_data["ends_at"],
+                )
+            messages.success(request, "Зміну заплановано.")
+            return redirect("products:schedule", slug=product.slug)
+    else:
+        form = ScheduledChangeForm()
+
+    context = {
+        "product": product,
+        "form": form,
+        "pending": product.scheduled_changes.filter(applied_at__isnull=True),
+    }
+    return render(request, "products/product_schedule.html", context)
+
+
 @login_required
 def product_delete(request, slug):
     """Delete a product (only for the product's seller)"""
@@ -285,33 +433,37 @@ def seller_dashboard(request):
     """Dashboard for sellers to manage their products"""
     require_seller(request.user)
 
-    products = Product.objects.filter(seller=request.user).order_by("-created_at")
+    reviewed = Q(reviews__user__isnull=False)
+    products = (
+        Product.objects.filter(seller=request.user)
+        .select_related("category")
+        .annotate(
+            num_reviews=Count("reviews", filter=reviewed),
+            rating=Avg("reviews__rating", filter=reviewed),
+        )
+        .order_by("-created_at")
+    )
 
     q = request.GET.get("q")
     if q:
         products = products.filter(Q(name__icontains=q) | Q(description__icontains=q))
 
-    try:
-        seller_profile = request.user.seller_profile
-    except Exception:
-        seller_profile = None
+    seller_profile = request.user.store
 
-    total_products = products.count()
-    active_products = products.filter(is_active=True).count()
+    products = list(products)
+    total_products = len(products)
+    active_products = sum(product.is_active for product in products)
+    total_reviews = sum(product.num_reviews for product in products)
+    total_rating = sum(product.rating or 0 for product in products)
 
-    total_reviews = 0
-    total_rating = 0
-    product_count = 0
+    avg_rating = total_rating / total_products if total_products > 0 else 0
 
-    for product in products:
-        try:
-            total_reviews += product.review_count
-            total_rating += product.average_rating
-            product_count += 1
-        except Exception as e:
-            print(f"Error calculating stats for product {product.name}: {e}")
-
-    avg_rating = total_rating / product_count if product_count > 0 else 0
+    try:
+        analytics_days = int(request.GET.get("range", ANALYTICS_RANGES[0]))
+    except ValueError:
+        analytics_days = ANALYTICS_RANGES[0]
+    if analytics_days not in ANALYTICS_RANGES:
+        analytics_days = ANALYTICS_RANGES[0]
 
     context = {
         "products": products,
@@ -320,11 +472,190 @@ def seller_dashboard(request):
         "active_products": active_products,
         "total_reviews": total_reviews,
         "avg_rating": round(avg_rating, 1),
+        "analytics": sales_series(request.user, analytics_days),
+        "analytics_ranges": ANALYTICS_RANGES,
     }
 
     return render(request, "products/seller_dashboard.html", context)
 
 
+@login_required
+@require_http_methods(["GET", "POST"])
+def bulk_inventory(request):
+    """Bulk update price, stock and availability from CSV or pasted rows"""
+    require_seller(request.user)
+
+    if request.GET.get("export") == "csv":
+        response = HttpResponse(content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = 'attachment; filename="inventory.csv"'
+        return export_inventory_csv(request.user, response)
+
+    report = None
+    has_errors = False
+    if request.method == "POST":
+        form = InventoryUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            rows = parse_inventory_rows(form.cleaned_data["text"])
+            report, changed = build_inventory_report(request.user, rows)
+            has_errors = any(entry["errors"] for entry in report)
+
+            if has_errors:
+                messages.error(
+                    request, "Файл містить помилки. Жодних змін не збережено."
+                )
+            elif form.cleaned_data["preview"]:
+                messages.info(
+                    request, f"Буде оновлено товарів: {len(changed)} з {len(rows)}."
+                )
+            else:
+                updated = apply_inventory_changes(request.user, changed)
+                messages.success(request, f"Оновлено товарів: {updated}.")
+    else:
+        form = InventoryUploadForm()
+
+    return render(
+        request,
+        "products/bulk_inventory.html",
+        {"form": form, "report": report, "has_errors": has_errors},
+    )
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def price_rules(request):
+    """Manage price rules and apply them to all matching products at once"""
+    require_seller(request.user)
+
+    rule_form = PriceRuleForm()
+    apply_form = PriceRuleApplyForm(seller=request.user)
+    preview = None
+
+    if request.method == "POST" and request.POST.get("form") == "create":
+        rule_form = PriceRuleForm(request.POST)
+        if rule_form.is_valid():
+            rule = rule_form.save(commit=False)
+            rule.seller = request.user
+            rule.save()
+            messages.success(request, f"Правило «{rule.name}» створено.")
+            return redirect("products:price_rules")
+    elif request.method == "POST":
+        apply_form = PriceRuleApplyForm(request.POST, seller=request.user)
+        if apply_form.is_valid():
+            rules = list(apply_form.cleaned_data["rules"])
+            changes, invalid = evaluate_rules(request.user, rules)
+            if invalid:
+                messages.error(
+                    request,
+                    f"Для {len(invalid)} товарів ціна виходить за допустимі межі. "
+                    "Жодних змін не збережено.",
+                )
+            elif apply_form.cleaned_data["preview"]:
+                messages.info(request, f"Буде оновлено товарів: {len(changes)}.")
+            else:
+                apply_price_rules(request.user, rules, changes)
+                messages.success(request, f"Оновлено цін: {len(changes)}.")
+                return redirect("products:price_rules")
+
+            shown = (invalid or changes)[:PREVIEW_ROWS]
+            names = dict(
+                Product.objects.filter(pk__in=[pk for pk, _, _ in shown]).values_list(
+                    "pk", "name"
+                )
+            )
+            preview = {
+                "rows": [
+                    (names.get(pk), to_price(before), to_price(after))
+                    for pk, before, after in shown
+                ],
+                "total": len(invalid or changes),
+                "invalid": bool(invalid),
+            }
+
+    context = {
+        "rule_form": rule_form,
+        "apply_form": apply_form,
+        "preview": preview,
+        "rules": PriceRule.objects.filter(seller=request.user).select_related(
+            "category"
+        ),
+        "batches": PriceChangeBatch.objects.filter(seller=request.user)[:10],
+    }
+    return render(request, "products/price_rules.html", context)
+
+
+@login_required
+@require_http_methods(["POST"])
+def price_rule_delete(request, rule_id):
+    require_seller(request.user)
+    rule = get_object_or_404(PriceRule, id=rule_id, seller=request.user)
+    rule.delete()
+    messages.success(request, f"Правило «{rule.name}» видалено.")
+    return redirect("products:price_rules")
+
+
+@login_required
+@require_http_methods(["POST"])
+def price_batch_rollback(request, batch_id):
+    """Restore the prices a rule application changed"""
+    require_seller(request.user)
+    batch = get_object_or_404(PriceChangeBatch, id=batch_id, seller=request.user)
+    if batch.rolled_back_at:
+        messages.info(request, "Ці зміни вже скасовано.")
+        return redirect("products:price_rules")
+
+    restored, skipped = rollback_price_batch(batch)
+    messages.success(request, f"Відновлено цін: {restored}.")
+    if skipped:
+        messages.warning(
+            request,
+            f"Пропущено товарів, ціну яких змінили після цього: {skipped}.",
+        )
+    return redirect("products:price_rules")
+
+
+@login_required
+def wishlist(request):
+    """Saved products and unread price-drop and restock alerts"""
+    items = request.user.wishlist_items.select_related("product")
+    alerts = list(
+        request.user.wishlist_alerts.filter(read_at__isnull=True).select_related(
+            "product"
+        )[:50]
+    )
+    if alerts:
+        WishlistAlert.objects.filter(id__in=[alert.id for alert in alerts]).update(
+            read_at=timezone.now()
+        )
+    return render(request, "products/wishlist.html", {"items": items, "alerts": alerts})
+
+
+@login_required
+@require_http_methods(["POST"])
+def wishlist_toggle(request, product_id):
+    if request.user.is_seller:
+        messages.error(request, "Продавці не можуть мати список обраного.")
+        return redirect("products:list")
+
+    product = get_object_or_404(Product, id=product_id)
+    # Unavailable products can only be removed
+    if (
+        not product.is_active
+        and not request.user.wishlist_items.filter(product=product).exists()
+    ):
+        raise Http404("Товар недоступний")
+    if toggle_wishlist(request.user, product):
+        messages.success(request, f"«{product.name}» додано до обраного.")
+    else:
+        messages.info(request, f"«{product.name}» видалено з обраного.")
+
+    next_url = request.POST.get("next")
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}
+    ):
+        return redirect(next_url)
+    return redirect("products:detail", slug=product.slug)
+
+
 def create_sample_data(request):
     """Create sample products and sellers for the marketplace"""
     from django.contrib.auth import get_user_model
@@ -0,0 +1,108 @@
+"""
+Wishlists and price-drop / restock alerts.
+
+``detect_wishlist_changes`` only looks at wishlist rows whose product was
+updated since the previous run (products carry an ``updated_at`` index), so
+its cost follows the number of changed products, not the number of saved
+items. Alerts are written in bulk and shown on the user's wishlist page.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import JobWatermark, WishlistAlert, WishlistItem
+
+WATERMARK = "wishlist_alerts"
+WATERMARK_OVERLAP = timedelta(minutes=5)
+WISHLIST_CHUNK_SIZE = 1000
+
+
+def toggle_wishlist(user, product):
+    """Save the product for the user, or remove it if saved. Returns True if saved"""
+    deleted, _ = WishlistItem.objects.filter(user=user, product=product).delete()
+    if deleted:
+        return False
+    WishlistItem.objects.get_or_create(
+        user=user,
+        product=product,
+        defaults={"price": product.price, "in_stock": product.stock > 0},
+    )
+    return True
+
+
+def _process_chunk(rows):
+    alerts, changed = [], []
+    for item_id, user_id, product_id, seen_price, seen_in_stock, price, stock in rows:
+        in_stock = stock > 0
+        if price < seen_price:
+            kind = "price_drop"
+        elif in_stock and not seen_in_stock:
+            kind = "restock"
+        else:
+            kind = None
+        if kind:
+            alerts.append(
+                WishlistAlert(
+                    user_id=user_id,
+                    product_id=product_id,
+                    kind=kind,
+                    old_price=seen_price,
+                    new_price=price,
+                )
+            )
+        if price != seen_price or in_stock != seen_in_stock:
+            changed.append(WishlistItem(pk=item_id, price=price, in_stock=in_stock))
+
+    WishlistAlert.objects.bulk_create(alerts)
+    WishlistItem.objects.bulk_update(changed, ["price", "in_stock"])
+    return len(alerts)
+
+
+def detect_wishlist_changes(full=False, chunk_size=WISHLIST_CHUNK_SIZE):
+    """
+    Create alerts for saved products that got cheaper or came back in stock
+    since the stored watermark. Returns the number of alerts created.
+
+    updated_at is set before the writing transaction commits, so each run also
+    re-reads ``WATERMARK_OVERLAP`` before the watermark. That is safe because
+    processed rows already hold the product's price and stock, and each chunk
+    commits on its own: an interrupted run leaves the watermark alone and the
+    next one picks up the rest.
+    """
+    until = timezone.now()
+    watermark = JobWatermark.objects.filter(name=WATERMARK).first()
+    if full or watermark is None:
+        since = None
+    else:
+        since = watermark.value - WATERMARK_OVERLAP
+
+    items = WishlistItem.objects.filter(
+        product__is_active=True, product__updated_at__lte=until
+    )
+    if since is not None:
+        items = items.filter(product__updated_at__gt=since)
+    rows = items.order_by("pk").values_list(
+        "pk",
+        "user_id",
+        "product_id",
+        "price",
+        "in_stock",
+        "product__price",
+        "product__stock",
+    )
+
+    created = 0
+    last_id = 0
+    # Keyset pages rather than one cursor, since the job updates the rows it
+    # reads
+    while True:
+        with transaction.atomic():
+            chunk = list(rows.filter(pk__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            created += _process_chunk(chunk)
+        last_id = chunk[-1][0]
+    JobWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": until})
+    return created